@@ -1,19 +1,173 @@
 # main.py
-from modules.scraper import run_scraper # Importe la fonction principale du module scraper
+import argparse
 import logging
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+# Les modules du projet sont importés dans la commande qui les utilise : pandas, numpy, bs4,
+# requests et psycopg2 ne sont chargés que si la commande lancée en a besoin.
 
-if __name__ == "__main__":
+
+def print_report(title, report):
+    """Affiche un rapport encadré dans la console."""
+    print("\n" + "="*50)
+    print(title)
+    print("="*50)
+    print(report)
+    print("="*50)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Scraping des avis Trustpilot de Nickel.")
+    subparsers = parser.add_subparsers(dest='command')
+
+    scrape_parser = subparsers.add_parser('scrape', help="Scrape les avis (commande par défaut)")
+    scrape_parser.add_argument('--archive', action='store_true', default=None,
+                               help="Archive le HTML brut de chaque page (voir ARCHIVE_DIR dans config.py)")
+    scrape_parser.add_argument('--async', dest='use_async', action='store_true',
+                               help="Scrape toutes les cibles en parallèle (voir SCRAPE_TARGETS dans config.py)")
+    scrape_parser.add_argument('--base-url', dest='base_urls', action='append', default=None,
+                               help="URL de base à scraper, se terminant par \"?page=\" (répétable ; en parallèle avec --async)")
+
+    reprocess_parser = subparsers.add_parser('reprocess', help="Rejoue les pages archivées dans le parser et la base, sans réseau")
+    reprocess_parser.add_argument('--archive-dir', default=None, help="Dossier de l'archive (par défaut ARCHIVE_DIR)")
+
+    daemon_parser = subparsers.add_parser('daemon', help="Scrape en continu les nouveaux avis (intervalle adaptatif, métriques HTTP)")
+    daemon_parser.add_argument('--base-url', default=None, help="URL de base à surveiller, se terminant par \"?page=\"")
+    daemon_parser.add_argument('--metrics-port', type=int, default=None, help="Port de /health et /metrics (par défaut DAEMON_METRICS_PORT)")
+
+    mock_parser = subparsers.add_parser('mock-server', help="Lance un serveur local imitant les pages d'avis Trustpilot")
+    mock_parser.add_argument('--port', type=int, default=None, help="Port d'écoute (par défaut MOCK_SERVER_PORT)")
+    mock_parser.add_argument('--pages', type=int, default=None, help="Nombre de pages servies")
+    mock_parser.add_argument('--latency', type=float, default=None, help="Latence moyenne d'une réponse, en secondes")
+    mock_parser.add_argument('--error-rate', type=float, default=None, help="Part des réponses en erreur 503 (0 à 1)")
+    mock_parser.add_argument('--rate-limit-rate', type=float, default=None, help="Part des réponses 429 (0 à 1)")
+    mock_parser.add_argument('--archive-dir', default=None, help="Sert les pages enregistrées dans cette archive au lieu de pages fictives")
+    mock_parser.add_argument('--seed', type=int, default=None, help="Graine des tirages aléatoires")
+
+    subparsers.add_parser('migrate', help="Crée ou met à jour le schéma de la base (à lancer après chaque mise à jour du projet)")
+
+    enqueue_parser = subparsers.add_parser('enqueue', help="Ajoute des plages de pages à la file de tâches partagée (mode distribué)")
+    enqueue_parser.add_argument('--pages', type=int, required=True, help="Nombre de pages à scraper par cible")
+    enqueue_parser.add_argument('--pages-per-task', type=int, default=None, help="Pages par tâche (par défaut WORK_QUEUE_PAGES_PER_TASK)")
+    enqueue_parser.add_argument('--base-url', dest='base_urls', action='append', default=None,
+                                help="URL de base, se terminant par \"?page=\" (répétable ; par défaut SCRAPE_TARGETS)")
+
+    worker_parser = subparsers.add_parser('worker', help="Traite les tâches de la file partagée (plusieurs workers possibles, sur plusieurs machines)")
+    worker_parser.add_argument('--worker-id', default=None, help="Identifiant du worker (par défaut machine-pid)")
+    worker_parser.add_argument('--wait', action='store_true', help="Attend de nouvelles tâches au lieu de s'arrêter quand la file est vide")
+
+    import_time_parser = subparsers.add_parser('import-time', help="Mesure le temps d'import des modules (-X importtime) et le compare aux budgets")
+    import_time_parser.add_argument('--runs', type=int, default=None, help="Nombre de mesures par module (par défaut IMPORT_TIME_RUNS)")
+
+    compare_parser = subparsers.add_parser('compare-runs', help="Compare la dernière exécution de scrape à l'historique (régressions de débit et de latence)")
+    compare_parser.add_argument('--window', type=int, default=None, help="Exécutions de référence (par défaut RUN_COMPARE_WINDOW)")
+    compare_parser.add_argument('--threshold', type=float, default=None, help="Seuil de z-score (par défaut RUN_COMPARE_Z_THRESHOLD)")
+    compare_parser.add_argument('--history', default=None, help="Fichier d'historique (par défaut RUN_HISTORY_PATH)")
+
+    return parser
+
+
+def run_enrichment_step():
+    """Enrichissement (longueur, langue, thèmes, score lexical) des avis nouvellement ingérés."""
+    from modules.enrichment import run_enrichment # Étape d'enrichissement du texte, lancée après l'ingestion
+    nb_enrichis = run_enrichment()
+    print(f"{nb_enrichis} avis enrichis.")
+
+
+def command_scrape(args):
     print("Démarrage du processus de scraping...\n")
-    
+
     # Appelle la fonction principale du scraper et stocke son retour
     # scraping_report = run_scraper(max_pages_to_scrape=3) # pour tester le scraping sur 3 pages
-    scraping_report = run_scraper() # pour tout scraper
-    
+    archive_pages = getattr(args, 'archive', None)
+    base_urls = getattr(args, 'base_urls', None)
+    if getattr(args, 'use_async', False):
+        import asyncio
+        from modules.async_scraper import run_scraper_async # Mode asynchrone : plusieurs entreprises en parallèle
+        scraping_report = asyncio.run(run_scraper_async(base_urls, archive_pages))
+    else:
+        from modules.scraper import run_scraper # Importe la fonction principale du module scraper
+        if base_urls and len(base_urls) > 1:
+            # Sans --async, les cibles sont scrapées l'une après l'autre
+            scraping_report = "\n\n".join(f"[{base_url}]\n" + run_scraper(archive_pages, base_url) for base_url in base_urls)
+        else:
+            scraping_report = run_scraper(archive_pages, base_urls[0] if base_urls else None) # pour tout scraper
+
     # Affiche le rapport de scraping
-    print("\n" + "="*50)
-    print("RAPPORT DE SCRAPING")
-    print("="*50)
-    print(scraping_report)
-    print("="*50)
\ No newline at end of file
+    print_report("RAPPORT DE SCRAPING", scraping_report)
+    run_enrichment_step()
+
+
+def command_reprocess(args):
+    from modules.scraper import reprocess_archive
+    print("Démarrage du retraitement des pages archivées...\n")
+    print_report("RAPPORT DE RETRAITEMENT", reprocess_archive(args.archive_dir))
+    run_enrichment_step()
+
+
+def command_daemon(args):
+    from modules.daemon import ScraperDaemon # Service de scraping en continu, à intervalle adaptatif
+    # L'enrichissement est lancé par le démon après chaque passage ayant ingéré de nouveaux avis
+    scraper_daemon = ScraperDaemon(base_url=args.base_url, metrics_port=args.metrics_port)
+    scraper_daemon.install_signal_handlers()
+    scraper_daemon.run()
+
+
+def command_mock_server(args):
+    from modules.mock_server import MockTrustpilotServer # Serveur local imitant Trustpilot, pour les tests de charge
+    server = MockTrustpilotServer(port=args.port, pages=args.pages, latency=args.latency,
+                                  error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                                  archive_dir=args.archive_dir, seed=args.seed)
+    print(f"Serveur de test : python main.py scrape --base-url \"{server.base_url}\" (Ctrl+C pour arrêter)")
+    server.serve_forever()
+
+
+def command_migrate(args):
+    from modules.database import create_reviews_table
+    create_reviews_table()
+    print("Schéma de la base à jour.")
+
+
+def command_enqueue(args):
+    from modules.work_queue import enqueue_tasks, queue_status
+    nb_tasks = enqueue_tasks(args.pages, args.base_urls, args.pages_per_task)
+    print(f"{nb_tasks} tâches ajoutées. {queue_status()}")
+
+
+def command_worker(args):
+    from modules.work_queue import run_worker
+    print_report("RAPPORT DU WORKER", run_worker(args.worker_id, args.wait))
+    run_enrichment_step()
+
+
+def command_import_time(args):
+    from modules.import_benchmark import check_import_budgets
+    report, all_ok = check_import_budgets(runs=args.runs)
+    print_report("TEMPS D'IMPORT", report)
+    return 0 if all_ok else 1
+
+
+def command_compare_runs(args):
+    from modules.run_history import compare_runs
+    report, ok = compare_runs(args.window, args.threshold, args.history)
+    print_report("COMPARAISON DES EXÉCUTIONS", report)
+    return 0 if ok else 1
+
+
+COMMANDS = {
+    'scrape': command_scrape,
+    'reprocess': command_reprocess,
+    'daemon': command_daemon,
+    'mock-server': command_mock_server,
+    'migrate': command_migrate,
+    'enqueue': command_enqueue,
+    'worker': command_worker,
+    'import-time': command_import_time,
+    'compare-runs': command_compare_runs,
+}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args()
+    # Sans sous-commande, python main.py lance le scraping
+    raise SystemExit(COMMANDS[args.command or 'scrape'](args))
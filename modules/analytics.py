@@ -0,0 +1,220 @@
+# modules/analytics.py
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from . import database
+
+
+# Colonnes de reviews_nickel nécessaires au calcul des indicateurs
+ANALYTICS_COLUMNS = [
+    'id', 'cible', 'note_avis', 'sentiment', 'reponse', 'date_publication',
+    'date_reponse', 'avis_sur_invitation', 'nombre_avis'
+]
+
+# Cache du module : le DataFrame chargé, le plus grand id d'avis et de modification vus,
+# et les KPIs calculés (par entreprise, None pour toutes entreprises confondues)
+_cache = {
+    'reviews': None,
+    'dernier_id': 0,
+    'dernier_changement_id': 0,
+    'kpis': {},
+}
+
+
+def _optimize_dtypes(df):
+    """Réduit l'empreinte mémoire d'un bloc d'avis (types compacts, catégories)."""
+    df['id'] = pd.to_numeric(df['id'], downcast='integer')
+    df['cible'] = df['cible'].astype('category')
+    df['note_avis'] = df['note_avis'].astype('Int8')
+    df['nombre_avis'] = df['nombre_avis'].astype('Int32')
+    df['sentiment'] = df['sentiment'].astype('category')
+    df['reponse'] = df['reponse'].astype('boolean')
+    df['avis_sur_invitation'] = df['avis_sur_invitation'].astype('boolean')
+    df['date_publication'] = pd.to_datetime(df['date_publication'])
+    df['date_reponse'] = pd.to_datetime(df['date_reponse'])
+    return df
+
+
+def load_reviews(since_id=0, ids=None, chunksize=None):
+    """
+    Charge les avis de 'reviews_nickel' dont l'id est supérieur à since_id
+    (et, si `ids` est fourni, dont l'id figure dans cette liste).
+    Utilise un curseur côté serveur (curseur nommé psycopg2) et lit les lignes
+    par blocs de `chunksize` pour borner la mémoire utilisée.
+
+    Returns:
+        pandas.DataFrame: Les avis chargés (éventuellement vide).
+    """
+    chunksize = chunksize or config.ANALYTICS_CHUNKSIZE
+    query = f"""
+        SELECT {', '.join(ANALYTICS_COLUMNS)}
+        FROM reviews_nickel
+        WHERE id > %s AND (%s::integer[] IS NULL OR id = ANY(%s::integer[]))
+        ORDER BY id;
+    """
+    conn = None
+    chunks = []
+    try:
+        conn = database._get_db_connection()
+        # Un curseur nommé est un curseur côté serveur : les lignes sont rapatriées bloc par bloc
+        with conn.cursor(name='analytics_reviews') as c:
+            c.itersize = chunksize
+            c.execute(query, (since_id, ids, ids))
+            while True:
+                rows = c.fetchmany(chunksize)
+                if not rows:
+                    break
+                chunks.append(_optimize_dtypes(pd.DataFrame.from_records(rows, columns=ANALYTICS_COLUMNS)))
+    except Exception as e:
+        logging.error(f"Erreur lors du chargement des avis pour l'analyse : {e}")
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
+
+    if not chunks:
+        return _optimize_dtypes(pd.DataFrame(columns=ANALYTICS_COLUMNS))
+    df = pd.concat(chunks, ignore_index=True)
+    # pd.concat perd le type 'category' si les catégories des blocs diffèrent
+    df['sentiment'] = df['sentiment'].astype('category')
+    df['cible'] = df['cible'].astype('category')
+    return df
+
+
+def rating_distribution(df):
+    """Distribution des notes (nombre et part de chaque note de 1 à 5)."""
+    counts = df['note_avis'].value_counts().reindex(range(1, 6), fill_value=0)
+    return pd.DataFrame({
+        'nb_avis': counts,
+        'part': counts / counts.sum() if counts.sum() else counts.astype(float),
+    }).rename_axis('note_avis')
+
+
+def sentiment_share_over_time(df, freq='M'):
+    """Part de chaque sentiment par période de publication (mois par défaut)."""
+    periods = df['date_publication'].dt.to_period(freq).rename('periode')
+    return pd.crosstab(periods, df['sentiment'], normalize='index')
+
+
+def response_kpis(df):
+    """Taux de réponse et délai médian de réponse (date_reponse - date_publication)."""
+    delays = (df['date_reponse'] - df['date_publication']).dropna()
+    return {
+        'taux_reponse': float(df['reponse'].mean()) if len(df) else None,
+        'delai_reponse_median': delays.median() if len(delays) else None,
+    }
+
+
+def invitation_vs_organic(df):
+    """Compare les notes des avis sur invitation et des avis spontanés."""
+    origine = np.where(df['avis_sur_invitation'].fillna(False), 'invitation', 'organique')
+    return df.groupby(origine)['note_avis'].agg(nb_avis='count', note_moyenne='mean').rename_axis('origine')
+
+
+def reviewer_experience_buckets(df):
+    """Regroupe les avis par expérience de l'auteur (colonne nombre_avis)."""
+    buckets = pd.cut(
+        df['nombre_avis'].astype('float'),
+        bins=config.ANALYTICS_EXPERIENCE_BINS,
+        labels=config.ANALYTICS_EXPERIENCE_LABELS,
+    )
+    return df.groupby(buckets, observed=False)['note_avis'].agg(nb_avis='count', note_moyenne='mean').rename_axis('experience')
+
+
+def compute_kpis(df):
+    """Calcule l'ensemble des indicateurs standards sur un DataFrame d'avis."""
+    kpis = {
+        'nb_avis': len(df),
+        'distribution_notes': rating_distribution(df),
+        'sentiment_par_mois': sentiment_share_over_time(df),
+        'invitation_vs_organique': invitation_vs_organic(df),
+        'experience_auteurs': reviewer_experience_buckets(df),
+    }
+    kpis.update(response_kpis(df))
+    return kpis
+
+
+def _load_changed_review_ids(since_change_id):
+    """
+    Lit le journal 'reviews_changes' au-delà de since_change_id.
+
+    Returns:
+        tuple: (id de la dernière modification lue, liste des id d'avis modifiés).
+    """
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            c.execute("""
+                SELECT COALESCE(MAX(id), %s), ARRAY_AGG(DISTINCT review_id)
+                FROM reviews_changes
+                WHERE id > %s;
+            """, (since_change_id, since_change_id))
+            last_change_id, review_ids = c.fetchone()
+            return last_change_id, review_ids or []
+    except Exception as e:
+        logging.error(f"Erreur lors de la lecture du journal des modifications : {e}")
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
+
+
+def get_kpis(force_reload=False, cible=None):
+    """
+    Retourne les indicateurs d'une entreprise (cible, par exemple "nickel.eu") ou, par défaut,
+    de toutes les entreprises confondues, en s'appuyant sur le cache du module.
+    Seuls les ANALYTICS_RELOAD_ID_WINDOW derniers id (et au-delà), et les avis plus anciens
+    modifiés depuis (réponse ou note, d'après le journal 'reviews_changes'), sont lus en base ;
+    les indicateurs ne sont recalculés que si quelque chose a changé.
+    """
+    # Le journal est lu avant les avis : une modification concurrente sera relue au prochain appel
+    last_change_id, changed_ids = _load_changed_review_ids(_cache['dernier_changement_id'])
+    _cache['dernier_changement_id'] = last_change_id
+
+    if force_reload or _cache['reviews'] is None:
+        _cache['reviews'] = load_reviews()
+        _cache['kpis'] = {}
+    else:
+        reviews = _cache['reviews']
+        # Fenêtre relue intégralement : elle couvre les avis validés après un id supérieur déjà chargé
+        window_start = max(_cache['dernier_id'] - config.ANALYTICS_RELOAD_ID_WINDOW, 0)
+        changed_before = [review_id for review_id in changed_ids if review_id <= window_start]
+        if changed_before:
+            logging.info(f"{len(changed_before)} avis modifiés rechargés pour l'analyse.")
+            reloaded = load_reviews(ids=changed_before)
+            reviews = pd.concat([reviews[~reviews['id'].isin(changed_before)], reloaded], ignore_index=True)
+            _cache['kpis'] = {}
+
+        tail = load_reviews(since_id=window_start)
+        in_window = reviews['id'] > window_start
+        new_count = len(set(tail['id']) - set(reviews.loc[in_window, 'id']))
+        tail_changed = len(changed_ids) > len(changed_before)
+        if new_count or tail_changed:
+            if new_count:
+                logging.info(f"{new_count} nouveaux avis chargés pour l'analyse.")
+            reviews = pd.concat([reviews[~in_window], tail], ignore_index=True)
+            _cache['kpis'] = {}
+        reviews['sentiment'] = reviews['sentiment'].astype('category')
+        reviews['cible'] = reviews['cible'].astype('category')
+        _cache['reviews'] = reviews
+
+    df = _cache['reviews']
+    if not df.empty:
+        _cache['dernier_id'] = int(df['id'].max())
+
+    if cible not in _cache['kpis']:
+        _cache['kpis'][cible] = compute_kpis(df if cible is None else df[df['cible'] == cible])
+    return _cache['kpis'][cible]
+
+
+def clear_cache():
+    """Vide le cache du module (le prochain appel à get_kpis relira toute la table)."""
+    _cache['reviews'] = None
+    _cache['dernier_id'] = 0
+    _cache['dernier_changement_id'] = 0
+    _cache['kpis'] = {}
@@ -0,0 +1,156 @@
+# modules/async_scraper.py
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import aiohttp
+
+from . import config
+from . import database
+from .health_monitor import SelectorHealthMonitor
+from .page_archive import PageArchive
+from .run_history import record_run
+from .scraper import RunReport, parse_page, _store_reviews, _format_report
+
+
+class _Executors:
+    """
+    Exécuteurs utilisés par le mode asynchrone pour les étapes bloquantes : le parsing
+    (BeautifulSoup) et les écritures en base (psycopg2) sont délégués à des threads. Les requêtes
+    HTTP, elles, sont faites nativement par la boucle asyncio (aiohttp).
+    """
+
+    def __init__(self):
+        self.parse = ThreadPoolExecutor(config.ASYNC_PARSE_WORKERS, thread_name_prefix='parse')
+        # Une connexion du pool par thread d'écriture, au plus
+        self.db = ThreadPoolExecutor(config.DB_POOL_MAX_CONNECTIONS, thread_name_prefix='db')
+
+    def shutdown(self):
+        for executor in (self.parse, self.db):
+            executor.shutdown(wait=True)
+
+
+async def fetch_page_async(page_url, session):
+    """
+    Équivalent asynchrone de scraper.fetch_page, avec une session aiohttp.
+
+    Returns:
+        str: Le HTML de la page, une chaîne vide si la page n'existe pas (404 au-delà de la
+             dernière page d'avis), ou None en cas d'erreur de requête.
+    """
+    logging.info(f"Scraping URL: {page_url}")
+    try:
+        async with session.get(page_url, headers={"User-Agent": config.USER_AGENT}) as response:
+            if response.status == 404:
+                logging.info(f"Page {page_url} introuvable (404) : fin de la pagination.")
+                return ""
+            response.raise_for_status()
+            return await response.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.error(f"Erreur de requête pour {page_url}: {e}")
+        return None
+
+
+async def scrape_page_async(page_url, current_datetime, session, executors, health_monitor=None, archive=None, report=None):
+    """
+    Équivalent asynchrone de scraper.scrape_page : même retour (liste de dictionnaires d'avis,
+    vide en cas d'erreur ou d'absence d'avis). Les durées mesurées incluent l'attente d'une
+    connexion ou d'un thread de parsing libre.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    html = await fetch_page_async(page_url, session)
+    if report:
+        report.add_fetch(html, time.perf_counter() - started)
+    if not html:
+        return []
+
+    if archive:
+        # Écriture faite depuis la boucle : les ajouts à l'archive ne se chevauchent jamais
+        archive.append(page_url, html, current_datetime)
+
+    started = time.perf_counter()
+    reviews = await loop.run_in_executor(
+        executors.parse, parse_page, html, page_url, current_datetime, health_monitor
+    )
+    if report:
+        report.add_parse(reviews, time.perf_counter() - started)
+    return reviews
+
+
+async def _scrape_target(base_url, session, executors, archive, report):
+    """
+    Scrape toutes les pages d'une cible (une entreprise), page après page comme run_scraper,
+    en comptabilisant dans report, et retourne son rapport. Les différentes cibles progressent en parallèle.
+    """
+    loop = asyncio.get_running_loop()
+    # Un suivi des sélecteurs par cible : les pages d'une même cible sont traitées une à une
+    health_monitor = SelectorHealthMonitor()
+
+    page = 1
+
+    while True:
+        page_url = f"{base_url}{page}"
+        reviews_on_page = await scrape_page_async(
+            page_url, datetime.now(), session, executors, health_monitor, archive, report
+        )
+
+        if not reviews_on_page:
+            logging.info(f"Plus d'avis trouvés sur la page {page} de {base_url}, arrêt du scraping.")
+            break
+
+        await loop.run_in_executor(executors.db, _store_reviews, reviews_on_page, report)
+
+        page += 1
+        await asyncio.sleep(config.SLEEP_TIME)
+
+    if health_monitor.selector_failure:
+        final_message = f"ÉCHEC : scraping interrompu à la page {page}, les sélecteurs ne reconnaissent plus les avis.\n"
+    elif page > 1:
+        final_message = f"Scraping terminé car plus d'avis trouvés après la page {page - 1}.\n"
+    else:
+        final_message = "Scraping terminé.\n"
+
+    return f"[{base_url}]\n" + _format_report(final_message, report, health_monitor)
+
+
+async def run_scraper_async(base_urls=None, archive_pages=None):
+    """
+    Scrape plusieurs cibles en parallèle dans un seul processus.
+
+    Args:
+        base_urls (list, optional): URLs de base (se terminant par "?page="), par défaut config.SCRAPE_TARGETS.
+        archive_pages (bool, optional): Archiver le HTML brut des pages (par défaut config.ARCHIVE_PAGES).
+
+    Returns:
+        str: Les rapports de chaque cible, mis bout à bout.
+    """
+    base_urls = base_urls or config.SCRAPE_TARGETS
+    if archive_pages is None:
+        archive_pages = config.ARCHIVE_PAGES
+
+    database.init_connection_pool(config.DB_POOL_MAX_CONNECTIONS)
+    executors = _Executors()
+    archive = PageArchive() if archive_pages else None
+    run_reports = [RunReport() for _ in base_urls]
+    started = time.perf_counter()
+    try:
+        database.ensure_schema()
+        # Le connecteur borne le nombre de requêtes simultanées (connexions ouvertes), toutes cibles confondues
+        connector = aiohttp.TCPConnector(limit=config.ASYNC_MAX_CONCURRENT_REQUESTS)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            reports = await asyncio.gather(*(
+                _scrape_target(base_url, session, executors, archive, report)
+                for base_url, report in zip(base_urls, run_reports)
+            ))
+    finally:
+        if archive:
+            archive.close()
+        executors.shutdown()
+        database.close_connection_pool()
+
+    record_run('async', run_reports, time.perf_counter() - started, base_urls)
+    return "\n\n".join(reports)
@@ -1,8 +1,69 @@
 # config.py
 
 BASE_URL = "https://fr.trustpilot.com/review/nickel.eu?page="
+# Entreprise (cible) attribuée aux avis dont l'URL ne permet pas de la déduire, et aux avis
+# collectés avant l'ajout de la colonne cible
+DEFAULT_CIBLE = 'nickel.eu'
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 SLEEP_TIME = 1
+REPORT_SAMPLE_SIZE = 10  # Nombre d'avis ajoutés détaillés dans le rapport final
+
+# --- MODE ASYNCHRONE (modules/async_scraper.py) ---
+# Entreprises scrapées en parallèle par python main.py scrape --async (URLs se terminant par "?page=") ;
+# les avis de chaque entreprise sont distingués par la colonne cible (voir CIBLE_SCHEMA_POSTGRES)
+SCRAPE_TARGETS = [BASE_URL]
+ASYNC_MAX_CONCURRENT_REQUESTS = 8   # Requêtes HTTP simultanées (connexions aiohttp), toutes cibles confondues
+ASYNC_PARSE_WORKERS = 4             # Threads de parsing HTML
+
+# --- SERVEUR DE TEST LOCAL (modules/mock_server.py, python main.py mock-server) ---
+MOCK_SERVER_HOST = '127.0.0.1'
+MOCK_SERVER_PORT = 8765
+MOCK_SERVER_PAGES = 100              # Nombre de pages fictives servies (404 au-delà)
+MOCK_SERVER_REVIEWS_PER_PAGE = 20
+MOCK_SERVER_LATENCY = 0.2            # Latence moyenne d'une réponse, en secondes
+MOCK_SERVER_LATENCY_JITTER = 0.05    # Variation maximale (+/-) autour de la latence moyenne
+MOCK_SERVER_ERROR_RATE = 0.0         # Part des réponses en erreur 503
+MOCK_SERVER_RATE_LIMIT_RATE = 0.0    # Part des réponses 429 (Too Many Requests)
+MOCK_SERVER_RETRY_AFTER = 1          # Valeur de l'en-tête Retry-After des réponses 429, en secondes
+MOCK_SERVER_SEED = 42                # Graine des tirages aléatoires (pages fictives, latence, erreurs)
+
+# --- MODE DÉMON (modules/daemon.py, python main.py daemon) ---
+DAEMON_INITIAL_INTERVAL = 300        # Intervalle entre deux passages au démarrage, en secondes
+DAEMON_MIN_INTERVAL = 60             # Intervalle minimal (flux d'avis soutenu)
+DAEMON_MAX_INTERVAL = 1800           # Intervalle maximal (flux d'avis calme)
+DAEMON_SPEEDUP_FACTOR = 2.0          # Division de l'intervalle quand de nouveaux avis sont trouvés
+DAEMON_SLOWDOWN_FACTOR = 1.5         # Multiplication de l'intervalle quand aucun nouvel avis n'est trouvé
+DAEMON_MAX_PAGES_PER_POLL = 10       # Pages parcourues au plus par passage
+DAEMON_METRICS_HOST = '127.0.0.1'    # Adresse d'écoute de /health et /metrics
+DAEMON_METRICS_PORT = 8766
+DAEMON_DB_POOL_CONNECTIONS = 2       # Connexions du pool du démon (un seul passage à la fois)
+
+# --- TEMPS DE DÉMARRAGE (modules/import_benchmark.py, python main.py import-time) ---
+IMPORT_TIME_RUNS = 5                 # Mesures par module (la médiane est comparée au budget)
+# Budget de temps d'import par module, en millisecondes (interpréteur neuf, -X importtime)
+IMPORT_TIME_BUDGETS_MS = {
+    'main': 30,                      # Analyse des arguments seule : aucune dépendance lourde
+    'modules.mock_server': 80,
+    'modules.search': 100,
+    'modules.scraper': 300,          # requests, bs4 et psycopg2, sans numpy ni pandas
+    'modules.daemon': 350,
+}
+
+# --- HISTORIQUE DES EXÉCUTIONS (modules/run_history.py, python main.py compare-runs) ---
+RUN_HISTORY_PATH = 'data/scrape_runs.jsonl'  # Une ligne JSON par exécution de scrape (débits, durées par étape)
+RUN_COMPARE_WINDOW = 10              # Exécutions précédentes (même mode, mêmes cibles) servant de référence
+RUN_COMPARE_MIN_BASELINE = 3         # En dessous, pas assez d'historique pour conclure
+RUN_COMPARE_Z_THRESHOLD = 3.0        # Écart à la moyenne de référence, en écarts-types, au-delà duquel une dérive est significative
+RUN_COMPARE_MIN_RELATIVE_CHANGE = 0.10  # Dérive relative minimale signalée (ignore les écarts significatifs mais négligeables)
+# Indicateurs comparés : 'higher' si une hausse est une amélioration, 'lower' si c'est une baisse
+RUN_COMPARE_METRICS = {
+    'pages_par_seconde': 'higher',
+    'avis_par_seconde': 'higher',
+    'secondes_par_page_telechargement': 'lower',
+    'secondes_par_page_analyse': 'lower',
+    'secondes_par_page_stockage': 'lower',
+    'taux_erreurs_requetes': 'lower',
+}
 
 # configuration des mois pour l'extraction des dates
 MOIS_MAPPING = {
@@ -26,6 +87,9 @@ DB_PASSWORD = "npg_nMbf3cliNj0y"
 DB_HOST = "ep-misty-dawn-a2l7mwke-pooler.eu-central-1.aws.neon.tech"
 DB_PORT = "5432"
 
+DB_POOL_MAX_CONNECTIONS = 8  # Taille maximale du pool de connexions (mode asynchrone)
+DB_POOL_CHECK_IDLE_SECONDS = 60  # Une connexion du pool inactive depuis plus longtemps est vérifiée (SELECT 1) avant usage
+
 
 # ####### bdd postgre locale #######
 
@@ -63,6 +127,249 @@ CREATE TABLE IF NOT EXISTS reviews_nickel (
 );
 """
 
+# --- ARCHIVE DES PAGES BRUTES (modules/page_archive.py) ---
+ARCHIVE_PAGES = False                       # Archiver le HTML brut de chaque page scrapée (python main.py scrape --archive)
+ARCHIVE_DIR = 'data/archive'                # Dossier des segments d'archive
+ARCHIVE_SEGMENT_MAX_BYTES = 64 * 1024 * 1024  # Taille au-delà de laquelle un nouveau segment est ouvert
+ARCHIVE_COMPRESSION_LEVEL = 6               # Niveau de compression zlib (1 = rapide, 9 = compact)
+
+# --- SANTÉ DES SÉLECTEURS (modules/health_monitor.py) ---
+# Taux minimal d'extraction réussie par champ et par page ; en dessous, une alerte est levée.
+HEALTH_MIN_SUCCESS_RATES = {
+    'date_publication': 0.95,
+    'nom': 0.95,
+    'nombre_avis': 0.9,
+    'note_avis': 0.95,
+    'date_experience': 0.8,
+    'contenu_avis': 0.95,
+    'contenu_hash': 0.95,
+    'date_reponse': 0.9,  # Mesuré uniquement sur les avis ayant une réponse
+}
+HEALTH_MIN_REVIEWS_PER_PAGE = 5           # En dessous, les taux d'une page ne sont pas évalués
+HEALTH_SAMPLE_DIR = 'data/health_samples' # Dossier des échantillons HTML en échec
+HEALTH_MAX_SAMPLES = 20                   # Nombre maximal d'échantillons sauvegardés par exécution
+
+# --- TABLES D'AGRÉGATS (mises à jour à chaque insertion d'avis) ---
+# Les moyennes et parts sont calculées à la lecture à partir des compteurs et sommes.
+STATS_SCHEMA_POSTGRES = """
+CREATE TABLE IF NOT EXISTS reviews_stats_jour (
+    jour DATE PRIMARY KEY,              -- Jour de publication des avis
+    nb_avis INTEGER NOT NULL DEFAULT 0,
+    nb_notes INTEGER NOT NULL DEFAULT 0,    -- Nombre d'avis ayant une note (dénominateur de la moyenne)
+    somme_notes INTEGER NOT NULL DEFAULT 0,
+    nb_positif INTEGER NOT NULL DEFAULT 0,
+    nb_neutre INTEGER NOT NULL DEFAULT 0,
+    nb_negatif INTEGER NOT NULL DEFAULT 0,
+    nb_reponses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS reviews_stats_mois (
+    mois DATE PRIMARY KEY,              -- Premier jour du mois de publication
+    nb_avis INTEGER NOT NULL DEFAULT 0,
+    nb_notes INTEGER NOT NULL DEFAULT 0,
+    somme_notes INTEGER NOT NULL DEFAULT 0,
+    nb_positif INTEGER NOT NULL DEFAULT 0,
+    nb_neutre INTEGER NOT NULL DEFAULT 0,
+    nb_negatif INTEGER NOT NULL DEFAULT 0,
+    nb_reponses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# --- ENRICHISSEMENT DU TEXTE (modules/enrichment.py) ---
+ENRICHMENT_BATCH_SIZE = 1000  # Nombre d'avis traités (et mis à jour en une requête) par lot
+
+# Colonnes ajoutées à reviews_nickel par l'enrichissement (doivent correspondre à ENRICHMENT_THEMES)
+ENRICHMENT_SCHEMA_POSTGRES = """
+ALTER TABLE reviews_nickel
+    ADD COLUMN IF NOT EXISTS longueur_avis INTEGER,
+    ADD COLUMN IF NOT EXISTS langue_detectee VARCHAR(5),
+    ADD COLUMN IF NOT EXISTS theme_carte_bloquee BOOLEAN,
+    ADD COLUMN IF NOT EXISTS theme_compte_cloture BOOLEAN,
+    ADD COLUMN IF NOT EXISTS theme_frais BOOLEAN,
+    ADD COLUMN IF NOT EXISTS score_sentiment_lexique REAL,
+    ADD COLUMN IF NOT EXISTS date_enrichissement TIMESTAMP;
+CREATE INDEX IF NOT EXISTS idx_reviews_non_enrichis ON reviews_nickel (id) WHERE date_enrichissement IS NULL;
+"""
+
+# Thèmes bancaires : nom de colonne -> expression régulière recherchée dans le texte en minuscules
+ENRICHMENT_THEMES = {
+    'theme_carte_bloquee': r"carte\s+(?:\w+\s+)?(?:bloqu|suspendu|désactiv|opposition)|bloqu\w*\s+(?:ma|la)\s+carte",
+    'theme_compte_cloture': r"compte\s+(?:\w+\s+)?(?:clôtur|clotur|fermé|ferme|bloqu|suspendu)|clôtur\w*\s+(?:mon|le)\s+compte",
+    'theme_frais': r"\bfrais\b|commission|prélèvement|facturé|\bpayer\b|\bpayant",
+}
+
+# Mots-outils utilisés pour la détection de langue
+ENRICHMENT_STOPWORDS = {
+    'fr': {'le', 'la', 'les', 'de', 'des', 'du', 'et', 'est', 'un', 'une', 'je', 'pas', 'que', 'pour', 'très', 'mon', 'ma', 'mais', 'avec', 'sur', 'il', 'ce', 'qui', 'en'},
+    'en': {'the', 'and', 'is', 'to', 'of', 'my', 'it', 'not', 'for', 'with', 'very', 'this', 'was', 'you', 'they', 'but', 'have'},
+    'es': {'el', 'los', 'las', 'y', 'es', 'muy', 'no', 'por', 'con', 'mi', 'una', 'para', 'pero', 'que'},
+}
+
+# Lexique de sentiment (polarité entre -1 et 1) pour le français
+ENRICHMENT_SENTIMENT_LEXICON = {
+    'bien': 0.5, 'bon': 0.5, 'bonne': 0.5, 'super': 1.0, 'génial': 1.0, 'excellent': 1.0, 'parfait': 1.0,
+    'rapide': 0.5, 'simple': 0.5, 'pratique': 0.5, 'efficace': 0.75, 'satisfait': 0.75, 'top': 1.0,
+    'merci': 0.5, 'recommande': 0.75, 'facile': 0.5, 'sympa': 0.5, 'aimable': 0.5, 'réactif': 0.75,
+    'mauvais': -0.75, 'nul': -1.0, 'nulle': -1.0, 'honteux': -1.0, 'arnaque': -1.0, 'voleurs': -1.0,
+    'catastrophique': -1.0, 'déçu': -0.75, 'déçue': -0.75, 'inadmissible': -1.0, 'lent': -0.5,
+    'bloqué': -0.5, 'bloquée': -0.5, 'problème': -0.5, 'impossible': -0.75, 'injoignable': -0.75,
+    'scandaleux': -1.0, 'fuyez': -1.0, 'pire': -1.0, 'incompétent': -0.75, 'attente': -0.25,
+}
+
+# Mots qui inversent la polarité du mot suivant
+ENRICHMENT_NEGATIONS = {'pas', 'jamais', 'aucun', 'aucune', 'ni', 'sans'}
+# Négations seulement précédées de "ne" / "n'" ("n'est plus rapide", mais pas "plus rapide")
+ENRICHMENT_NE_NEGATIONS = {'plus'}
+ENRICHMENT_NE_PARTICLES = {'ne', 'n'}
+
+# --- DÉTECTION DES QUASI-DOUBLONS (modules/near_duplicates.py) ---
+NEAR_DUPLICATE_SHINGLE_SIZE = 5     # Taille des n-grammes de caractères comparés
+NEAR_DUPLICATE_MIN_LENGTH = 30      # Longueur minimale (texte normalisé) pour indexer un avis ("Super !" n'est pas indexé)
+NEAR_DUPLICATE_NUM_PERM = 80        # Nombre de permutations MinHash (taille de la signature)
+NEAR_DUPLICATE_BANDS = 16           # Nombre de bandes LSH (NUM_PERM doit en être un multiple)
+NEAR_DUPLICATE_THRESHOLD = 0.7      # Similarité de Jaccard estimée à partir de laquelle deux avis sont quasi-doublons
+NEAR_DUPLICATE_SEED = 42            # Graine des permutations : ne pas changer sur un index existant
+
+NEAR_DUPLICATES_SCHEMA_POSTGRES = """
+CREATE TABLE IF NOT EXISTS reviews_minhash (
+    review_id INTEGER PRIMARY KEY REFERENCES reviews_nickel (id) ON DELETE CASCADE,
+    signature BIGINT[] NOT NULL,        -- Signature MinHash du contenu normalisé
+    cluster_id INTEGER NOT NULL         -- id du premier avis du groupe de quasi-doublons
+);
+CREATE TABLE IF NOT EXISTS reviews_minhash_bandes (
+    bande SMALLINT NOT NULL,            -- Numéro de la bande LSH
+    valeur BIGINT NOT NULL,             -- Hash des valeurs de la signature dans cette bande
+    review_id INTEGER NOT NULL REFERENCES reviews_minhash (review_id) ON DELETE CASCADE,
+    PRIMARY KEY (bande, valeur, review_id)
+);
+CREATE INDEX IF NOT EXISTS idx_minhash_cluster ON reviews_minhash (cluster_id);
+"""
+
+# --- RECHERCHE PLEIN TEXTE (modules/search.py) ---
+FULLTEXT_CONFIG = 'french'          # Configuration de recherche plein texte de PostgreSQL (racinisation, mots vides)
+FULLTEXT_DEFAULT_LIMIT = 20         # Nombre de résultats retournés par défaut
+
+# Colonne tsvector générée et indexée (GIN) ; la configuration est écrite en dur car une colonne
+# générée n'accepte que des expressions immuables.
+FULLTEXT_SCHEMA_POSTGRES = """
+ALTER TABLE reviews_nickel
+    ADD COLUMN IF NOT EXISTS contenu_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('french', coalesce(contenu_avis, ''))) STORED;
+CREATE INDEX IF NOT EXISTS idx_reviews_contenu_tsv ON reviews_nickel USING GIN (contenu_tsv);
+CREATE INDEX IF NOT EXISTS idx_reviews_date_publication ON reviews_nickel (date_publication);
+"""
+
+# --- DÉTECTION DES MODIFICATIONS D'AVIS (réponses de l'entreprise, notes modifiées) ---
+# empreinte_mutable : MD5 de (reponse, date_reponse, note_avis) calculé au scraping.
+# reviews_changes : journal append-only des modifications détectées par upsert_reviews_batch.
+CHANGES_SCHEMA_POSTGRES = """
+ALTER TABLE reviews_nickel ADD COLUMN IF NOT EXISTS empreinte_mutable CHAR(32);
+CREATE TABLE IF NOT EXISTS reviews_changes (
+    id SERIAL PRIMARY KEY,
+    review_id INTEGER NOT NULL REFERENCES reviews_nickel (id) ON DELETE CASCADE,
+    ancienne_note INTEGER,
+    nouvelle_note INTEGER,
+    ancienne_reponse BOOLEAN,
+    nouvelle_reponse BOOLEAN,
+    ancienne_date_reponse TIMESTAMP,
+    nouvelle_date_reponse TIMESTAMP,
+    date_changement TIMESTAMP NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_changes_review ON reviews_changes (review_id);
+"""
+
+# --- DIMENSION DES AUTEURS D'AVIS (table reviewers, mise à jour à chaque insertion d'avis) ---
+# nom_hash : MD5 du nom normalisé (minuscules, sans accents, espaces réduits), clé de l'auteur.
+# premiere_apparition / derniere_apparition : dates de publication du premier et du dernier avis collectés.
+# nom et nombre_avis sont ceux de l'avis le plus récent de l'auteur.
+REVIEWERS_SCHEMA_POSTGRES = """
+ALTER TABLE reviews_nickel ADD COLUMN IF NOT EXISTS nom_hash CHAR(32);
+CREATE INDEX IF NOT EXISTS idx_reviews_nickel_nom_hash ON reviews_nickel (nom_hash);
+CREATE TABLE IF NOT EXISTS reviewers (
+    nom_hash CHAR(32) PRIMARY KEY,
+    nom TEXT,
+    nombre_avis INTEGER,
+    premiere_apparition TIMESTAMP,
+    derniere_apparition TIMESTAMP,
+    nb_avis_collectes INTEGER NOT NULL DEFAULT 0,
+    nb_avis_sur_invitation INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_reviewers_nb_avis_collectes ON reviewers (nb_avis_collectes DESC);
+CREATE INDEX IF NOT EXISTS idx_reviewers_nombre_avis ON reviewers (nombre_avis DESC NULLS LAST);
+"""
+
+# --- ENTREPRISE DE CHAQUE AVIS (plusieurs entreprises scrapées, voir SCRAPE_TARGETS) ---
+# cible : identifiant Trustpilot de l'entreprise ("nickel.eu"), déduit de l'URL de la page.
+# L'unicité d'un avis, les agrégats et la table des auteurs sont définis par entreprise.
+# Exécuté après les autres schémas : migre aussi une base créée avant cette colonne.
+CIBLE_SCHEMA_POSTGRES = f"""
+ALTER TABLE reviews_nickel ADD COLUMN IF NOT EXISTS cible VARCHAR(255) NOT NULL DEFAULT '{DEFAULT_CIBLE}';
+ALTER TABLE reviews_nickel DROP CONSTRAINT IF EXISTS reviews_nickel_contenu_hash_date_publication_key;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reviews_nickel_cible_avis ON reviews_nickel (cible, contenu_hash, date_publication);
+
+ALTER TABLE reviews_stats_jour ADD COLUMN IF NOT EXISTS cible VARCHAR(255) NOT NULL DEFAULT '{DEFAULT_CIBLE}';
+ALTER TABLE reviews_stats_jour DROP CONSTRAINT IF EXISTS reviews_stats_jour_pkey;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reviews_stats_jour_cible ON reviews_stats_jour (cible, jour);
+ALTER TABLE reviews_stats_mois ADD COLUMN IF NOT EXISTS cible VARCHAR(255) NOT NULL DEFAULT '{DEFAULT_CIBLE}';
+ALTER TABLE reviews_stats_mois DROP CONSTRAINT IF EXISTS reviews_stats_mois_pkey;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reviews_stats_mois_cible ON reviews_stats_mois (cible, mois);
+
+ALTER TABLE reviewers ADD COLUMN IF NOT EXISTS cible VARCHAR(255) NOT NULL DEFAULT '{DEFAULT_CIBLE}';
+ALTER TABLE reviewers DROP CONSTRAINT IF EXISTS reviewers_pkey;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reviewers_auteur_cible ON reviewers (nom_hash, cible);
+CREATE INDEX IF NOT EXISTS idx_reviewers_cible_nb_avis_collectes ON reviewers (cible, nb_avis_collectes DESC);
+CREATE INDEX IF NOT EXISTS idx_reviewers_cible_nombre_avis ON reviewers (cible, nombre_avis DESC NULLS LAST);
+"""
+
+# --- FILE DE TÂCHES DISTRIBUÉE (modules/work_queue.py, python main.py enqueue / worker) ---
+# Chaque tâche est une plage de pages d'une cible. Un worker prend une tâche par SELECT ... FOR UPDATE
+# SKIP LOCKED et la « loue » jusqu'à bail_expire_le : une tâche dont le bail a expiré (worker arrêté)
+# est reprise par un autre worker, au plus WORK_QUEUE_MAX_ATTEMPTS fois.
+WORK_QUEUE_PAGES_PER_TASK = 10       # Taille par défaut des plages de pages
+WORK_QUEUE_LEASE_SECONDS = 300       # Durée du bail, prolongée après chaque page traitée
+WORK_QUEUE_MAX_ATTEMPTS = 3          # Au-delà, la tâche passe en échec
+WORK_QUEUE_POLL_INTERVAL = 5         # Attente d'un worker sans tâche disponible (mode --wait), en secondes
+CRAWL_TASKS_SCHEMA_POSTGRES = """
+CREATE TABLE IF NOT EXISTS crawl_tasks (
+    id SERIAL PRIMARY KEY,
+    base_url TEXT NOT NULL,
+    page_debut INTEGER NOT NULL,
+    page_fin INTEGER NOT NULL,
+    statut VARCHAR(20) NOT NULL DEFAULT 'en_attente', -- en_attente, en_cours, termine, echec
+    worker TEXT,
+    tentatives INTEGER NOT NULL DEFAULT 0,
+    derniere_page_traitee INTEGER, -- Une tâche reprise repart de la page suivante
+    bail_expire_le TIMESTAMP,
+    date_creation TIMESTAMP NOT NULL DEFAULT NOW(),
+    date_debut TIMESTAMP,
+    date_fin TIMESTAMP,
+    nb_pages_traitees INTEGER,
+    nb_avis_nouveaux INTEGER,
+    nb_avis_mis_a_jour INTEGER,
+    derniere_erreur TEXT,
+    UNIQUE (base_url, page_debut, page_fin)
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_tasks_statut ON crawl_tasks (statut, id);
+"""
+
+# Relations dont la présence indique un schéma à jour (au moins une par bloc ci-dessus, dont le dernier
+# objet créé par CIBLE_SCHEMA_POSTGRES) : vérifiées sans DDL par database.ensure_schema.
+# À compléter à chaque nouvelle migration.
+SCHEMA_CHECK_RELATIONS = [
+    'reviews_nickel', 'reviews_stats_jour', 'reviews_stats_mois', 'idx_reviews_non_enrichis',
+    'reviews_minhash', 'reviews_minhash_bandes', 'idx_reviews_contenu_tsv', 'reviews_changes',
+    'crawl_tasks', 'reviewers', 'uq_reviews_nickel_cible_avis', 'uq_reviews_stats_jour_cible',
+    'uq_reviews_stats_mois_cible', 'uq_reviewers_auteur_cible', 'idx_reviewers_cible_nombre_avis',
+]
+
+# --- ANALYSES (modules/analytics.py) ---
+ANALYTICS_CHUNKSIZE = 5000  # Nombre de lignes rapatriées par bloc depuis le curseur côté serveur
+# Les id SERIAL sont attribués à l'insertion et non au commit : une transaction concurrente peut
+# valider un id inférieur au dernier id chargé. Les ANALYTICS_RELOAD_ID_WINDOW derniers id sont relus à chaque appel.
+ANALYTICS_RELOAD_ID_WINDOW = 10000
+# Tranches d'expérience des auteurs, basées sur la colonne nombre_avis
+ANALYTICS_EXPERIENCE_BINS = [0, 1, 5, 20, float('inf')]
+ANALYTICS_EXPERIENCE_LABELS = ['1 avis', '2 à 5 avis', '6 à 20 avis', 'plus de 20 avis']
+
 ###### bdd sqlite3 #######
 # #DATABASE_PATH = 'data/sqlite_reviews_nickel.db'
 # DATABASE_PATH = 'data/TEST.db' # Pour les tests
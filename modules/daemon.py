@@ -0,0 +1,204 @@
+# modules/daemon.py
+
+import json
+import logging
+import signal
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from . import config
+from . import database
+from .health_monitor import SelectorHealthMonitor
+from .scraper import RunReport, scrape_page, _store_reviews
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Expose /health et /metrics (JSON) à partir de l'état du ScraperDaemon."""
+
+    def do_GET(self):
+        daemon = self.server.scraper_daemon
+        if self.path == '/health':
+            health = daemon.health()
+            self._send_json(200 if health['status'] == 'ok' else 503, health)
+        elif self.path == '/metrics':
+            self._send_json(200, daemon.metrics())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Serveur de métriques : {format % args}")
+
+
+class ScraperDaemon:
+    """
+    Service de scraping en continu.
+
+    Garde ouverts une session HTTP et un pool de connexions PostgreSQL, et interroge la
+    première page des avis à intervalle adaptatif : l'intervalle est divisé par
+    DAEMON_SPEEDUP_FACTOR quand de nouveaux avis arrivent et multiplié par DAEMON_SLOWDOWN_FACTOR
+    sinon, entre DAEMON_MIN_INTERVAL et DAEMON_MAX_INTERVAL. Seul le delta est ingéré : les pages
+    suivantes ne sont parcourues que tant que tous les avis d'une page sont nouveaux
+    (au plus DAEMON_MAX_PAGES_PER_POLL : l'historique complet se récupère avec la commande scrape).
+    """
+
+    def __init__(self, base_url=None, metrics_host=None, metrics_port=None):
+        self.base_url = base_url or config.BASE_URL
+        self.metrics_host = metrics_host or config.DAEMON_METRICS_HOST
+        self.metrics_port = config.DAEMON_METRICS_PORT if metrics_port is None else metrics_port
+        self.interval = config.DAEMON_INITIAL_INTERVAL
+
+        self.started_at = datetime.now()
+        self.polls = 0
+        self.failed_polls = 0
+        self.pages_fetched = 0
+        self.total_new_reviews = 0
+        self.total_updated_reviews = 0
+        self.last_poll_at = None
+        self.last_poll_duration = None
+        self.last_new_review_at = None
+        self.last_error = None
+        self.selector_failure = False
+        self.next_poll_at = None
+
+        self._session = None
+        self._metrics_server = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """
+        Ingère les avis publiés depuis le dernier passage.
+
+        Returns:
+            int: Le nombre de nouveaux avis ingérés.
+        """
+        health_monitor = SelectorHealthMonitor()
+        report = RunReport()
+        page = 1
+        while page <= config.DAEMON_MAX_PAGES_PER_POLL:
+            reviews_on_page = scrape_page(f"{self.base_url}{page}", datetime.now(), health_monitor, session=self._session)
+            if not reviews_on_page:
+                break
+            nb_new, _ = _store_reviews(reviews_on_page, report)
+            if nb_new < len(reviews_on_page):
+                break # Des avis déjà connus : le reste de l'historique est déjà en base
+            page += 1
+            time.sleep(config.SLEEP_TIME)
+
+        if report.total_new_reviews:
+            from .enrichment import run_enrichment # pandas n'est chargé qu'au premier passage avec de nouveaux avis
+            run_enrichment()
+
+        with self._lock:
+            self.pages_fetched += report.nb_pages
+            self.total_new_reviews += report.total_new_reviews
+            self.total_updated_reviews += report.total_updated_reviews
+            self.selector_failure = health_monitor.selector_failure
+            if report.total_new_reviews:
+                self.last_new_review_at = datetime.now()
+        if health_monitor.selector_failure or report.nb_pages == 0:
+            # Page 1 vide ou en erreur : les avis de Nickel ne disparaissent pas, c'est une panne
+            raise RuntimeError(f"Aucun avis récupéré sur la page 1 de {self.base_url}.")
+        return report.total_new_reviews
+
+    def _next_interval(self, nb_new):
+        """Raccourcit l'intervalle quand des avis arrivent, l'allonge quand le flux est calme."""
+        if nb_new:
+            interval = self.interval / config.DAEMON_SPEEDUP_FACTOR
+        else:
+            interval = self.interval * config.DAEMON_SLOWDOWN_FACTOR
+        return min(max(interval, config.DAEMON_MIN_INTERVAL), config.DAEMON_MAX_INTERVAL)
+
+    def run(self):
+        """Boucle principale : s'exécute jusqu'à stop() (ou SIGTERM / Ctrl+C)."""
+        self._session = requests.Session()
+        database.init_connection_pool(config.DAEMON_DB_POOL_CONNECTIONS)
+        database.ensure_schema()
+        self._start_metrics_server()
+        logging.info(f"Démon démarré sur {self.base_url} (métriques : http://{self.metrics_host}:{self.metrics_port}/metrics).")
+        try:
+            while not self._stop_event.is_set():
+                started = time.monotonic()
+                nb_new = 0
+                try:
+                    nb_new = self.poll()
+                    with self._lock:
+                        self.last_error = None
+                except Exception as e:
+                    logging.error(f"Erreur lors du passage du démon : {e}")
+                    with self._lock:
+                        self.failed_polls += 1
+                        self.last_error = str(e)
+                with self._lock:
+                    self.polls += 1
+                    self.last_poll_at = datetime.now()
+                    self.last_poll_duration = round(time.monotonic() - started, 3)
+                    self.interval = self._next_interval(nb_new)
+                    self.next_poll_at = datetime.fromtimestamp(time.time() + self.interval)
+                logging.info(f"Passage terminé : {nb_new} nouveaux avis, prochain passage dans {self.interval:.0f} s.")
+                self._stop_event.wait(self.interval)
+        finally:
+            self._stop_metrics_server()
+            self._session.close()
+            database.close_connection_pool()
+            logging.info("Démon arrêté.")
+
+    def stop(self):
+        """Demande l'arrêt du démon (pris en compte pendant l'attente entre deux passages)."""
+        self._stop_event.set()
+
+    def install_signal_handlers(self):
+        """Arrêt propre sur SIGTERM et SIGINT (à appeler depuis le thread principal)."""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: self.stop())
+
+    def health(self):
+        """État de santé : 'ok' tant que le dernier passage a réussi et que les sélecteurs fonctionnent."""
+        with self._lock:
+            status = 'ok' if self.last_error is None and not self.selector_failure else 'degraded'
+            return {'status': status, 'last_poll_at': self.last_poll_at, 'last_error': self.last_error}
+
+    def metrics(self):
+        """Compteurs de débit et état de l'ordonnancement adaptatif."""
+        with self._lock:
+            uptime = (datetime.now() - self.started_at).total_seconds()
+            return {
+                'started_at': self.started_at,
+                'uptime_seconds': round(uptime, 1),
+                'polls': self.polls,
+                'failed_polls': self.failed_polls,
+                'pages_fetched': self.pages_fetched,
+                'new_reviews': self.total_new_reviews,
+                'updated_reviews': self.total_updated_reviews,
+                'new_reviews_per_hour': round(self.total_new_reviews * 3600 / uptime, 2) if uptime else 0.0,
+                'poll_interval_seconds': round(self.interval, 1),
+                'last_poll_at': self.last_poll_at,
+                'last_poll_duration_seconds': self.last_poll_duration,
+                'last_new_review_at': self.last_new_review_at,
+                'next_poll_at': self.next_poll_at,
+            }
+
+    def _start_metrics_server(self):
+        self._metrics_server = ThreadingHTTPServer((self.metrics_host, self.metrics_port), _MetricsRequestHandler)
+        self._metrics_server.daemon_threads = True
+        self._metrics_server.scraper_daemon = self
+        self.metrics_port = self._metrics_server.server_address[1] # Port réellement attribué si port=0
+        threading.Thread(target=self._metrics_server.serve_forever, daemon=True).start()
+
+    def _stop_metrics_server(self):
+        if self._metrics_server:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
+            self._metrics_server = None
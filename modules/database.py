@@ -1,164 +1,782 @@
 # database.py
 from . import config
 from datetime import datetime, date 
+from collections import Counter
+import hashlib
+import re
+import time
+import unicodedata
 
 #########################################################
 ################### postgresql ###################
 import psycopg2 # Pour PostgreSQL
-from . import config 
+from psycopg2.pool import ThreadedConnectionPool # Pool de connexions partagé entre threads
+from psycopg2.extras import execute_values # Pour les insertions/mises à jour en masse
 import logging # Pour des logs d'erreurs plus robustes
-# Configurez le logging (peut être déplacé dans un fichier de configuration de logging si le projet grandit)
+# Le logging est configuré par le point d'entrée (main.py), pas à l'import des modules
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Colonnes insérées dans reviews_nickel, dans l'ordre des valeurs de _review_to_row
+INSERT_COLUMNS = [
+    'nom', 'nombre_avis', 'langue_origine', 'note_avis',
+    'date_publication', 'date_experience', 'jour_experience', 'mois_experience',
+    'annee_experience', 'contenu_avis', 'contenu_hash', 'avis_sur_invitation',
+    'sentiment', 'reponse', 'date_reponse', 'date_scraping', 'empreinte_mutable', 'nom_hash', 'cible'
+]
+
+# Champs d'un avis qui peuvent changer après sa publication (couverts par empreinte_mutable)
+MUTABLE_FIELDS = ['reponse', 'date_reponse', 'note_avis']
+
+# Tables d'agrégats maintenues à l'insertion : période -> (table, colonne clé, granularité date_trunc)
+STATS_TABLES = {
+    'jour': ('reviews_stats_jour', 'jour', 'day'),
+    'mois': ('reviews_stats_mois', 'mois', 'month'),
+}
+
+# Colonnes de la table 'reviewers' retournées par les fonctions de lecture des auteurs
+REVIEWER_COLUMNS = ['nom_hash', 'cible', 'nom', 'nombre_avis', 'premiere_apparition', 'derniere_apparition',
+                    'nb_avis_collectes', 'nb_avis_sur_invitation']
+
+# Tris proposés par get_top_reviewers : nom -> expression ORDER BY (couverte par un index de 'reviewers')
+REVIEWER_ORDERINGS = {
+    'nb_avis_collectes': 'nb_avis_collectes DESC',
+    'nombre_avis': 'nombre_avis DESC NULLS LAST',
+}
+
+# Pool de connexions optionnel (mode asynchrone, mode démon) ; sans pool, une connexion est ouverte par opération
+_connection_pool = None
+# id(connexion) -> instant (time.monotonic) où la connexion a été rendue au pool
+_connection_released_at = {}
+
+def _connection_params():
+    """Paramètres de connexion à la base de données PostgreSQL."""
+    return dict(
+        dbname=config.DB_NAME,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        sslmode='verify-full',
+        sslrootcert='system' 
+    )
+
+def init_connection_pool(max_connections=None):
+    """
+    Crée un pool de connexions partagé entre threads : les fonctions du module réutilisent
+    alors des connexions déjà ouvertes au lieu d'en ouvrir une par opération.
+    Le nombre d'utilisateurs simultanés ne doit pas dépasser max_connections.
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        max_connections = max_connections or config.DB_POOL_MAX_CONNECTIONS
+        # minconn = maxconn : le pool ferme toute connexion rendue au-delà de minconn,
+        # les threads d'écriture rouvriraient sinon une connexion TLS à presque chaque lot
+        _connection_pool = ThreadedConnectionPool(max_connections, max_connections, **_connection_params())
+        logging.info(f"Pool de {max_connections} connexions PostgreSQL initialisé.")
+
+def close_connection_pool():
+    """Ferme toutes les connexions du pool (si un pool a été créé)."""
+    global _connection_pool
+    if _connection_pool is not None:
+        _connection_pool.closeall()
+        _connection_pool = None
+        _connection_released_at.clear()
+
+def _is_alive(conn):
+    """Vérifie par un aller-retour au serveur qu'une connexion n'a pas été coupée."""
+    try:
+        with conn.cursor() as c:
+            c.execute("SELECT 1;")
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+def _get_pooled_connection():
+    """
+    Emprunte une connexion au pool. Une connexion restée inactive plus de DB_POOL_CHECK_IDLE_SECONDS
+    est d'abord vérifiée (le serveur ou un équipement réseau a pu la couper) ; une connexion coupée
+    est écartée du pool et remplacée par une nouvelle.
+    """
+    # Chaque connexion du pool peut être coupée : au pire toutes sont écartées, puis une neuve est ouverte
+    for _ in range(_connection_pool.maxconn + 1):
+        conn = _connection_pool.getconn()
+        released_at = _connection_released_at.pop(id(conn), None)
+        if released_at is None or time.monotonic() - released_at < config.DB_POOL_CHECK_IDLE_SECONDS:
+            if not conn.closed:
+                return conn
+        elif _is_alive(conn):
+            return conn
+        logging.warning("Connexion PostgreSQL du pool coupée, remplacée par une nouvelle connexion.")
+        _connection_pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("Aucune connexion PostgreSQL valide n'a pu être obtenue du pool.")
 
 def _get_db_connection():
-    """Établit et retourne une connexion à la base de données PostgreSQL."""
+    """Établit (ou emprunte au pool) et retourne une connexion à la base de données PostgreSQL."""
     try:
-        conn = psycopg2.connect(
-            dbname=config.DB_NAME,
-            user=config.DB_USER,
-            password=config.DB_PASSWORD,
-            host=config.DB_HOST,
-            port=config.DB_PORT,
-            sslmode='verify-full',
-            sslrootcert='system' 
-        )
+        if _connection_pool is not None:
+            return _get_pooled_connection()
+        conn = psycopg2.connect(**_connection_params())
         return conn
     except Exception as e:
         logging.error(f"Erreur de connexion à la base de données PostgreSQL : {e}")
         raise # Rélève l'exception pour que les fonctions appelantes la gèrent
 
+def _release_db_connection(conn):
+    """Rend la connexion au pool (une connexion coupée en est écartée), ou la ferme s'il n'y a pas de pool."""
+    if _connection_pool is not None:
+        if not conn.closed:
+            _connection_released_at[id(conn)] = time.monotonic()
+        _connection_pool.putconn(conn, close=bool(conn.closed))
+    else:
+        conn.close()
+
+def _rollback(conn):
+    """
+    Annule la transaction en cours après une erreur. Si la connexion a été coupée, l'annulation
+    échouerait à son tour et masquerait l'erreur d'origine : elle est alors ignorée.
+    """
+    try:
+        conn.rollback()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+        logging.warning(f"Annulation impossible, connexion PostgreSQL coupée : {e}")
+
 def create_reviews_table():
-    """Crée la table 'reviews_nickel' si elle n'existe pas dans PostgreSQL."""
+    """
+    Crée la table 'reviews_nickel' si elle n'existe pas dans PostgreSQL,
+    ainsi que les tables d'agrégats, les colonnes d'enrichissement, l'index des quasi-doublons
+    l'index de recherche plein texte, le journal des modifications d'avis, la file de tâches et la table des auteurs,
+    puis la colonne cible (entreprise) de ces tables.
+    Les ALTER TABLE prennent un verrou ACCESS EXCLUSIVE même lorsqu'ils ne changent rien : cette migration
+    est lancée par python main.py migrate (et enqueue), les commandes de scraping utilisent ensure_schema.
+    """
     conn = None # Initialiser à None
     try:
         conn = _get_db_connection()
         with conn.cursor() as c: # Utilisation du context manager pour le curseur
             c.execute(config.TABLE_SCHEMA_POSTGRES)
+            c.execute(config.STATS_SCHEMA_POSTGRES)
+            c.execute(config.ENRICHMENT_SCHEMA_POSTGRES)
+            c.execute(config.NEAR_DUPLICATES_SCHEMA_POSTGRES)
+            c.execute(config.FULLTEXT_SCHEMA_POSTGRES)
+            c.execute(config.CHANGES_SCHEMA_POSTGRES)
+            c.execute(config.CRAWL_TASKS_SCHEMA_POSTGRES)
+            c.execute(config.REVIEWERS_SCHEMA_POSTGRES)
+            c.execute(config.CIBLE_SCHEMA_POSTGRES)
         conn.commit() # Commit la création de table
-        logging.info(f"Table 'reviews_nickel' vérifiée/créée dans la base de données PostgreSQL '{config.DB_NAME}'.")
+        logging.info(f"Table 'reviews_nickel' et tables d'agrégats vérifiées/créées dans la base de données PostgreSQL '{config.DB_NAME}'.")
     except Exception as e:
         logging.error(f"Erreur lors de la création de la table : {e}")
         if conn:
-            conn.rollback() # Annuler en cas d'erreur
+            _rollback(conn) # Annuler en cas d'erreur
         raise # Rélève l'exception
     finally:
         if conn:
-            conn.close() # Ferme la connexion
+            _release_db_connection(conn) # Ferme (ou rend au pool) la connexion
+
+def missing_schema_relations():
+    """
+    Vérifie, sans DDL ni verrou sur les tables, la présence des relations de config.SCHEMA_CHECK_RELATIONS.
+
+    Returns:
+        list: Les relations absentes (vide si le schéma est à jour).
+    """
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as c:
+            c.execute("""
+                SELECT relation FROM unnest(%s::text[]) AS relation
+                WHERE to_regclass(relation) IS NULL;
+            """, (config.SCHEMA_CHECK_RELATIONS,))
+            missing = [row[0] for row in c.fetchall()]
+        conn.commit()
+        return missing
+    except Exception as e:
+        logging.error(f"Erreur lors de la vérification du schéma : {e}")
+        raise
+    finally:
+        if conn:
+            _release_db_connection(conn)
+
+def ensure_schema():
+    """
+    Vérifie que le schéma est à jour et ne lance la migration (create_reviews_table)
+    que s'il ne l'est pas : base neuve ou antérieure à une migration.
+    """
+    missing = missing_schema_relations()
+    if missing:
+        logging.info(f"Schéma incomplet ({', '.join(missing)} absent(s)) : migration de la base.")
+        create_reviews_table()
+
+def _review_cible(review_data):
+    """Entreprise d'un avis (DEFAULT_CIBLE pour un avis construit sans URL de page)."""
+    return review_data.get('cible') or config.DEFAULT_CIBLE
+
+def _publication_key(date_publication):
+    """
+    Date de publication d'un avis telle que PostgreSQL la retourne (datetime sans fuseau),
+    pour comparer un avis scrapé (date en chaîne) aux lignes d'un RETURNING.
+    """
+    if isinstance(date_publication, str):
+        try:
+            return datetime.fromisoformat(date_publication).replace(tzinfo=None)
+        except ValueError:
+            return date_publication # Date brute non parsée : laissée telle quelle
+    return date_publication
+
+def _review_to_row(review_data):
+    """Convertit un dictionnaire d'avis en tuple de valeurs, dans l'ordre de INSERT_COLUMNS."""
+    # Les dates sont passées sous forme de chaînes ('%Y-%m-%d %H:%M:%S' ou '%Y-%m-%d'),
+    # PostgreSQL se charge de la conversion vers TIMESTAMP/DATE.
+    review_data = {
+        **review_data,
+        'empreinte_mutable': _mutable_fingerprint(review_data),
+        'nom_hash': _reviewer_key(review_data.get('nom')),
+        'cible': _review_cible(review_data),
+    }
+    return tuple(review_data.get(column) for column in INSERT_COLUMNS)
+
+def _stats_delta(rows, granularity):
+    """
+    Calcule, côté Python, la contribution d'un lot d'avis aux agrégats d'une période.
+
+    Args:
+        rows (iterable): Tuples (cible, date_publication, note_avis, sentiment, reponse).
+        granularity (str): 'day' ou 'month'.
+
+    Returns:
+        list: Tuples (cible, periode, nb_avis, nb_notes, somme_notes, nb_positif, nb_neutre, nb_negatif, nb_reponses),
+              triés par (cible, periode).
+    """
+    delta = {}
+    for cible, date_publication, note_avis, sentiment, reponse in rows:
+        if not isinstance(date_publication, datetime):
+            continue # Date de publication absente ou non parsée : l'avis n'est rattaché à aucune période
+        periode = date_publication.date()
+        if granularity == 'month':
+            periode = periode.replace(day=1)
+        counters = delta.setdefault((cible, periode), [0, 0, 0, 0, 0, 0, 0])
+        counters[0] += 1
+        if note_avis is not None:
+            counters[1] += 1
+            counters[2] += note_avis
+        if sentiment == "Positif":
+            counters[3] += 1
+        elif sentiment == "Neutre":
+            counters[4] += 1
+        elif sentiment == "Négatif":
+            counters[5] += 1
+        if reponse:
+            counters[6] += 1
+    return [(*key, *counters) for key, counters in sorted(delta.items())]
+
+def _apply_stats_delta(cursor, rows, sign=1):
+    """
+    Répercute un lot d'avis sur les tables d'agrégats (upsert incrémental).
+    sign=1 ajoute la contribution des avis, sign=-1 la retire.
+    Doit être appelée dans la même transaction que l'écriture des avis.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    for table, key_column, granularity in STATS_TABLES.values():
+        values = [
+            (cible, periode, *(sign * counter for counter in counters))
+            for cible, periode, *counters in _stats_delta(rows, granularity)
+        ]
+        if not values:
+            continue
+        execute_values(cursor, f"""
+            INSERT INTO {table} (cible, {key_column}, nb_avis, nb_notes, somme_notes,
+                   nb_positif, nb_neutre, nb_negatif, nb_reponses)
+            VALUES %s
+            ON CONFLICT (cible, {key_column}) DO UPDATE SET
+                nb_avis = {table}.nb_avis + EXCLUDED.nb_avis,
+                nb_notes = {table}.nb_notes + EXCLUDED.nb_notes,
+                somme_notes = {table}.somme_notes + EXCLUDED.somme_notes,
+                nb_positif = {table}.nb_positif + EXCLUDED.nb_positif,
+                nb_neutre = {table}.nb_neutre + EXCLUDED.nb_neutre,
+                nb_negatif = {table}.nb_negatif + EXCLUDED.nb_negatif,
+                nb_reponses = {table}.nb_reponses + EXCLUDED.nb_reponses;
+        """, values)
+
+def _mutable_fingerprint(review_data):
+    """
+    Empreinte MD5 des champs d'un avis susceptibles de changer après sa publication
+    (réponse de l'entreprise, date de réponse, note). Sert à détecter les avis modifiés sans comparer champ par champ.
+    """
+    values = "|".join(str(review_data.get(field)) for field in MUTABLE_FIELDS)
+    return hashlib.md5(values.encode('utf-8')).hexdigest()
+
+def _reviewer_key(nom):
+    """
+    Clé d'un auteur d'avis : MD5 du nom normalisé (minuscules, accents supprimés, espaces réduits),
+    pour que les variantes d'écriture d'un même nom désignent le même auteur. None si le nom est vide.
+    """
+    if not nom:
+        return None
+    normalized = unicodedata.normalize('NFKD', nom.casefold())
+    normalized = "".join(char for char in normalized if not unicodedata.combining(char))
+    normalized = re.sub(r"\s+", " ", normalized).strip()
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest() if normalized else None
+
+def _reviewers_delta(rows):
+    """
+    Calcule, côté Python, la contribution d'un lot d'avis à la table des auteurs.
+
+    Args:
+        rows (iterable): Tuples (cible, nom_hash, nom, nombre_avis, avis_sur_invitation, date_publication).
+
+    Returns:
+        list: Tuples (nom_hash, cible, nom, nombre_avis, premiere_apparition, derniere_apparition,
+              nb_avis_collectes, nb_avis_sur_invitation), triés par (nom_hash, cible).
+    """
+    delta = {}
+    for cible, nom_hash, nom, nombre_avis, avis_sur_invitation, date_publication in rows:
+        if nom_hash is None:
+            continue
+        if not isinstance(date_publication, datetime):
+            date_publication = None
+        current = delta.get((nom_hash, cible))
+        if current is None:
+            delta[(nom_hash, cible)] = [nom, nombre_avis, date_publication, date_publication, 1, int(bool(avis_sur_invitation))]
+            continue
+        current[4] += 1
+        current[5] += int(bool(avis_sur_invitation))
+        if date_publication is None:
+            continue
+        if current[2] is None or date_publication < current[2]:
+            current[2] = date_publication
+        if current[3] is None or date_publication >= current[3]:
+            # L'avis le plus récent donne le nom affiché et le nombre d'avis le plus à jour
+            current[0], current[1], current[3] = nom, nombre_avis, date_publication
+    # Ordre de verrouillage constant : deux écritures concurrentes ne peuvent pas s'interbloquer
+    return [(*key, *values) for key, values in sorted(delta.items())]
+
+def _apply_reviewers_delta(cursor, rows):
+    """
+    Répercute un lot d'avis nouvellement insérés sur la table 'reviewers' (upsert incrémental en une requête).
+    Doit être appelée dans la même transaction que l'insertion des avis.
+    """
+    values = _reviewers_delta(rows)
+    if not values:
+        return
+    execute_values(cursor, """
+        INSERT INTO reviewers (nom_hash, cible, nom, nombre_avis, premiere_apparition, derniere_apparition,
+               nb_avis_collectes, nb_avis_sur_invitation)
+        VALUES %s
+        ON CONFLICT (nom_hash, cible) DO UPDATE SET
+            nom = CASE WHEN reviewers.derniere_apparition IS NULL
+                         OR EXCLUDED.derniere_apparition >= reviewers.derniere_apparition
+                       THEN EXCLUDED.nom ELSE reviewers.nom END,
+            nombre_avis = CASE WHEN reviewers.derniere_apparition IS NULL
+                                 OR EXCLUDED.derniere_apparition >= reviewers.derniere_apparition
+                               THEN COALESCE(EXCLUDED.nombre_avis, reviewers.nombre_avis) ELSE reviewers.nombre_avis END,
+            premiere_apparition = LEAST(reviewers.premiere_apparition, EXCLUDED.premiere_apparition),
+            derniere_apparition = GREATEST(reviewers.derniere_apparition, EXCLUDED.derniere_apparition),
+            nb_avis_collectes = reviewers.nb_avis_collectes + EXCLUDED.nb_avis_collectes,
+            nb_avis_sur_invitation = reviewers.nb_avis_sur_invitation + EXCLUDED.nb_avis_sur_invitation;
+    """, values, template="(%s, %s, %s, %s::integer, %s::timestamp, %s::timestamp, %s, %s)", page_size=len(values))
+
+def _detect_and_apply_changes(cursor, reviews):
+    """
+    Compare les avis déjà présents en base à leur version fraîchement scrapée, via l'empreinte
+    des champs modifiables, puis met à jour en masse les seules lignes modifiées et journalise
+    les changements dans 'reviews_changes'. Doit être appelée dans la transaction d'écriture.
+
+    Returns:
+        int: Le nombre d'avis dont un champ modifiable a effectivement changé.
+    """
+    if not reviews:
+        return 0
+
+    # Un avis présent deux fois dans le lot ne doit être comparé (et compté) qu'une fois :
+    # la jointure le retournerait deux fois. La dernière version scrapée l'emporte.
+    reviews = list({(_review_cible(r), r.get('contenu_hash'), r.get('date_publication')): r for r in reviews}.values())
+
+    # Comparaison en une requête : seules les lignes dont l'empreinte diffère sont retournées (et verrouillées)
+    diff_rows = execute_values(cursor, """
+        SELECT r.id, r.date_publication, r.note_avis, r.sentiment, r.reponse, r.date_reponse,
+               v.note_avis, v.sentiment, v.reponse, v.date_reponse, v.empreinte_mutable, r.cible
+        FROM reviews_nickel r
+        JOIN (VALUES %s) AS v(cible, contenu_hash, date_publication, note_avis, sentiment, reponse, date_reponse, empreinte_mutable)
+          ON r.cible = v.cible AND r.contenu_hash = v.contenu_hash AND r.date_publication = v.date_publication
+        WHERE r.empreinte_mutable IS DISTINCT FROM v.empreinte_mutable
+        FOR UPDATE OF r;
+    """, [
+        (_review_cible(r), r.get('contenu_hash'), r.get('date_publication'), r.get('note_avis'), r.get('sentiment'),
+         r.get('reponse'), r.get('date_reponse'), _mutable_fingerprint(r))
+        for r in reviews
+    ], template="(%s, %s, %s::timestamp, %s::integer, %s::varchar, %s::boolean, %s::timestamp, %s)", fetch=True)
+
+    if not diff_rows:
+        return 0
+
+    # Mise à jour en masse (y compris des lignes antérieures à l'empreinte, dont seule l'empreinte change)
+    execute_values(cursor, """
+        UPDATE reviews_nickel AS r
+        SET note_avis = v.note_avis, sentiment = v.sentiment, reponse = v.reponse,
+            date_reponse = v.date_reponse, empreinte_mutable = v.empreinte_mutable
+        FROM (VALUES %s) AS v(id, note_avis, sentiment, reponse, date_reponse, empreinte_mutable)
+        WHERE r.id = v.id;
+    """, [(row[0], *row[6:11]) for row in diff_rows],
+        template="(%s, %s::integer, %s::varchar, %s::boolean, %s::timestamp, %s)", page_size=len(diff_rows))
+
+    # Seules les lignes dont un champ a réellement changé sont journalisées et répercutées sur les agrégats
+    changed_rows = [row for row in diff_rows if row[2:6] != row[6:10]]
+    if changed_rows:
+        execute_values(cursor, """
+            INSERT INTO reviews_changes (review_id, ancienne_note, nouvelle_note, ancienne_reponse,
+                   nouvelle_reponse, ancienne_date_reponse, nouvelle_date_reponse)
+            VALUES %s;
+        """, [(row[0], row[2], row[6], row[4], row[8], row[5], row[9]) for row in changed_rows])
+        _apply_stats_delta(cursor, ((row[11], row[1], *row[2:5]) for row in changed_rows), sign=-1)
+        _apply_stats_delta(cursor, ((row[11], row[1], *row[6:9]) for row in changed_rows))
+    return len(changed_rows)
+
+def _write_reviews_batch(reviews, detect_changes):
+    """
+    Écrit un lot d'avis dans PostgreSQL en une seule transaction : insertion en une requête
+    (ON CONFLICT DO NOTHING sur (cible, contenu_hash, date_publication)), mise à jour des agrégats, de la
+    table des auteurs et de l'index des quasi-doublons, et, si detect_changes, mise à jour des avis existants modifiés.
+
+    Returns:
+        tuple: (liste des avis insérés, nombre d'avis existants mis à jour).
+    """
+    valid_reviews = []
+    for review_data in reviews:
+        if not review_data.get('contenu_hash'):
+            logging.warning(f"Impossible d'insérer l'avis : 'contenu_hash' manquant pour {review_data.get('nom', 'N/A')}.")
+            continue
+        valid_reviews.append(review_data)
+
+    if not valid_reviews:
+        return [], 0
+
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as c:
+            insert_query = f"""
+                INSERT INTO reviews_nickel ({', '.join(INSERT_COLUMNS)})
+                VALUES %s
+                ON CONFLICT (cible, contenu_hash, date_publication) DO NOTHING
+                RETURNING contenu_hash, id, contenu_avis, date_publication, note_avis, sentiment, reponse,
+                          nom_hash, nom, nombre_avis, avis_sur_invitation, cible;
+            """
+            inserted_rows = execute_values(
+                c, insert_query, [_review_to_row(r) for r in valid_reviews], fetch=True
+            )
+            # Mise à jour incrémentale des agrégats et des auteurs avec les seules lignes réellement insérées
+            _apply_stats_delta(c, ((row[11], *row[3:7]) for row in inserted_rows))
+            _apply_reviewers_delta(c, ((row[11], *row[7:11], row[3]) for row in inserted_rows))
+            # Indexation MinHash et rattachement aux groupes de quasi-doublons existants
+            # (import différé : numpy n'est chargé que par les commandes qui écrivent des avis)
+            from . import near_duplicates
+            near_duplicates.index_reviews(c, ((*row[1:3], row[11]) for row in inserted_rows))
+
+            # Un même avis peut apparaître deux fois dans le lot : on ne retient qu'autant d'avis que de lignes insérées.
+            # La clé est celle de l'unicité en base : des avis distincts (titre seul, texte générique) partagent un hash.
+            remaining = Counter((row[11], row[0], row[3]) for row in inserted_rows)
+            inserted_reviews = []
+            existing_reviews = []
+            for review_data in valid_reviews:
+                key = (_review_cible(review_data), review_data['contenu_hash'],
+                       _publication_key(review_data.get('date_publication')))
+                if remaining[key] > 0:
+                    remaining[key] -= 1
+                    inserted_reviews.append(review_data)
+                else:
+                    existing_reviews.append(review_data)
+
+            nb_updated = _detect_and_apply_changes(c, existing_reviews) if detect_changes else 0
+        conn.commit()
+
+        nb_duplicates = len(existing_reviews) - nb_updated
+        if nb_duplicates:
+            logging.info(f"{nb_duplicates} avis déjà présents en base et inchangés, insertion ignorée.")
+        if nb_updated:
+            logging.info(f"{nb_updated} avis déjà présents en base mis à jour (réponse ou note modifiée).")
+        return inserted_reviews, nb_updated
+
+    except Exception as e:
+        logging.error(f"Erreur lors de l'écriture d'un lot de {len(valid_reviews)} avis : {e}")
+        if conn:
+            _rollback(conn) # Annuler en cas d'erreur
+        raise # Rélève l'exception
+    finally:
+        if conn:
+            _release_db_connection(conn) # Ferme (ou rend au pool) la connexion
+
+def insert_reviews_batch(reviews):
+    """
+    Insère un lot d'avis dans PostgreSQL en une seule requête et une seule transaction.
+    Gère l'unicité par (cible, contenu_hash, date_publication) en utilisant ON CONFLICT DO NOTHING,
+    et met à jour les tables d'agrégats et l'index des quasi-doublons dans la même transaction.
+    Les avis déjà présents ne sont pas modifiés (voir upsert_reviews_batch).
+
+    Args:
+        reviews (list): Liste de dictionnaires d'avis (tels que retournés par scrape_page).
+
+    Returns:
+        list: Les avis effectivement insérés (les doublons et les avis sans hash sont exclus).
+    """
+    inserted_reviews, _ = _write_reviews_batch(reviews, detect_changes=False)
+    return inserted_reviews
+
+def upsert_reviews_batch(reviews):
+    """
+    Comme insert_reviews_batch, mais les avis déjà présents dont la réponse, la date de réponse
+    ou la note ont changé sont mis à jour en masse, et chaque changement est ajouté au journal
+    'reviews_changes' (append-only).
+
+    Args:
+        reviews (list): Liste de dictionnaires d'avis (tels que retournés par scrape_page).
+
+    Returns:
+        tuple: (liste des avis insérés, nombre d'avis existants mis à jour).
+    """
+    return _write_reviews_batch(reviews, detect_changes=True)
 
 def insert_review_data(review_data):
     """
     Insère un avis dans la base de données PostgreSQL.
     Gère l'unicité par contenu_hash en utilisant ON CONFLICT.
-    Retourne True si l'avis a été inséré/mis à jour, False si le hash est manquant.
+    Retourne True si l'avis a été inséré, False si c'est un doublon ou si le hash est manquant.
+    """
+    return bool(insert_reviews_batch([review_data]))
+
+def rebuild_stats_tables():
+    """
+    Reconstruit entièrement les tables d'agrégats à partir de 'reviews_nickel'.
+    À utiliser une fois après la création des tables sur une base déjà remplie.
     """
     conn = None
     try:
-        contenu_hash = review_data.get('contenu_hash')
+        conn = _get_db_connection()
+        with conn.cursor() as c:
+            for table, key_column, granularity in STATS_TABLES.values():
+                c.execute(f"TRUNCATE {table};")
+                c.execute(f"""
+                    INSERT INTO {table} (cible, {key_column}, nb_avis, nb_notes, somme_notes,
+                           nb_positif, nb_neutre, nb_negatif, nb_reponses)
+                    SELECT cible, date_trunc('{granularity}', date_publication)::date,
+                           COUNT(*),
+                           COUNT(note_avis),
+                           COALESCE(SUM(note_avis), 0),
+                           COUNT(*) FILTER (WHERE sentiment = 'Positif'),
+                           COUNT(*) FILTER (WHERE sentiment = 'Neutre'),
+                           COUNT(*) FILTER (WHERE sentiment = 'Négatif'),
+                           COUNT(*) FILTER (WHERE reponse)
+                    FROM reviews_nickel
+                    WHERE date_publication IS NOT NULL
+                    GROUP BY 1, 2;
+                """)
+        conn.commit()
+        logging.info("Tables d'agrégats reconstruites.")
+    except Exception as e:
+        logging.error(f"Erreur lors de la reconstruction des tables d'agrégats : {e}")
+        if conn:
+            _rollback(conn)
+        raise
+    finally:
+        if conn:
+            _release_db_connection(conn)
+
+def get_stats(periode='jour', date_debut=None, date_fin=None, cible=None):
+    """
+    Lit les agrégats pré-calculés (lecture en O(nombre de périodes)).
 
-        if not contenu_hash:
-            logging.warning("Impossible d'insérer l'avis : 'contenu_hash' manquant.")
-            return False
+    Args:
+        periode (str): 'jour' ou 'mois'.
+        date_debut (date, optional): Borne inférieure incluse.
+        date_fin (date, optional): Borne supérieure incluse.
+        cible (str, optional): Entreprise ("nickel.eu") ; par défaut, toutes entreprises confondues.
 
+    Returns:
+        list: Dictionnaires (periode, nb_avis, note_moyenne, part de chaque sentiment, taux_reponse).
+    """
+    table, key_column, _ = STATS_TABLES[periode]
+    conn = None
+    try:
         conn = _get_db_connection()
         with conn.cursor() as c:
-            # Utilisation de ON CONFLICT (contenu_hash) DO NOTHING;
-            # Cela insérera si le hash est unique, ou ne fera rien si le hash existe déjà.
-
-                    # --- DÉBUT DES CONVERSIONS DE TYPE (INDISPENSABLE MAINTENANT) ---
-
-            # date_publication (vers datetime.date car votre schema est DATE)
-            date_publication_str = review_data.get('date_publication')
-            date_publication_obj = None
-            if date_publication_str:
-                try:
-                    # Assurez-vous que le format de date est correct (ex: '2025-07-22')
-                    # Si 'YYYY-MM-DD HH:MM:SS', utilisez datetime.strptime(date_publication_str, '%Y-%m-%d %H:%M:%S').date()
-                    # Si 'YYYY-MM-DDTHH:MM:SSZ', utilisez datetime.fromisoformat(...).date()
-                    # Compte tenu de votre `extract_publication_date` qui renvoie `'%Y-%m-%d %H:%M:%S'`, on doit s'adapter :
-                    date_publication_obj = datetime.strptime(date_publication_str, '%Y-%m-%d %H:%M:%S').date()
-                except ValueError as ve:
-                    logging.warning(f"Impossible de parser date_publication '{date_publication_str}' en DATE: {ve}")
-
-            # date_experience (vers datetime.date car votre schema est DATE)
-            date_experience_str = review_data.get('date_experience')
-            date_experience_obj = None
-            if date_experience_str:
-                try:
-                    date_experience_obj = datetime.strptime(date_experience_str, '%Y-%m-%d').date()
-                except ValueError as ve:
-                    logging.warning(f"Impossible de parser date_experience '{date_experience_str}' en DATE: {ve}")
-
-            # date_scraping (vers datetime.datetime car votre schema est TIMESTAMP)
-            date_scraping_str = review_data.get('date_scraping')
-            date_scraping_obj = None
-            if date_scraping_str:
-                try:
-                    # le scraper mettait déjà %Y-%m-%d %H:%M:%S
-                    date_scraping_obj = datetime.strptime(date_scraping_str, '%Y-%m-%d %H:%M:%S')
-                except ValueError as ve:
-                    logging.warning(f"Impossible de parser date_scraping '{date_scraping_str}' en TIMESTAMP: {ve}")
-
-
-            # date_reponse (vers datetime.date car le schema est DATE)
-            date_reponse_str = review_data.get('date_reponse')
-            date_reponse_obj = None
-            if date_reponse_str:
-                try:
-                    # le scraper mettait déjà %Y-%m-%d %H:%M:%S
-                    date_reponse_obj = datetime.strptime(date_reponse_str, '%Y-%m-%d %H:%M:%S').date()
-                except ValueError as ve:
-                    logging.warning(f"Impossible de parser date_reponse '{date_reponse_str}' en DATE: {ve}")
-
-            # Les autres champs (Boolean, INTEGER, VARCHAR, TEXT) ne nécessitent pas de conversion spéciale.
-            avis_sur_invitation = review_data.get('avis_sur_invitation')
-            reponse = review_data.get('reponse')
-
-
-            insert_query = """
-                INSERT INTO reviews_nickel (nom, nombre_avis, langue_origine, note_avis,
-                       date_publication, date_experience, jour_experience, mois_experience,
-                      annee_experience, contenu_avis, contenu_hash, avis_sur_invitation,
-                       sentiment, reponse, date_reponse, date_scraping)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (contenu_hash, date_publication) DO NOTHING;
-            """
-            # Les valeurs sont passées sous forme de tuple, psycopg2 gère le mapping des types
-            c.execute(insert_query, (
-                review_data.get('nom'),
-                review_data.get('nombre_avis'),
-                review_data.get('langue_origine'),
-                review_data.get('note_avis'),
-                review_data.get('date_publication'),
-                review_data.get('date_experience'),
-                review_data.get('jour_experience'),
-                review_data.get('mois_experience'),
-                review_data.get('annee_experience'),
-                review_data.get('contenu_avis'),
-                review_data.get('contenu_hash'),
-                review_data.get('avis_sur_invitation'),
-                review_data.get('sentiment'),
-                review_data.get('reponse'),
-                review_data.get('date_reponse'),
-                review_data.get('date_scraping')
-            ))
-            # rowcount sera 1 si une nouvelle ligne a été insérée, 0 si le conflit a empêché l'insertion
-            if c.rowcount > 0:
-                conn.commit()
-                #logging.info(f"Avis avec hash '{contenu_hash}' inséré avec succès.")
-                return True
-            else:
-                logging.info(f"Avis avec hash '{contenu_hash}' est un doublon, insertion ignorée.")
-                return False
+            c.execute(f"""
+                SELECT {key_column}, SUM(nb_avis),
+                       SUM(somme_notes)::float / NULLIF(SUM(nb_notes), 0),
+                       SUM(nb_positif)::float / NULLIF(SUM(nb_avis), 0),
+                       SUM(nb_neutre)::float / NULLIF(SUM(nb_avis), 0),
+                       SUM(nb_negatif)::float / NULLIF(SUM(nb_avis), 0),
+                       SUM(nb_reponses)::float / NULLIF(SUM(nb_avis), 0)
+                FROM {table}
+                WHERE (%(cible)s::text IS NULL OR cible = %(cible)s)
+                  AND (%(debut)s::date IS NULL OR {key_column} >= %(debut)s::date)
+                  AND (%(fin)s::date IS NULL OR {key_column} <= %(fin)s::date)
+                GROUP BY {key_column}
+                ORDER BY {key_column};
+            """, {'cible': cible, 'debut': date_debut, 'fin': date_fin})
+            columns = ['periode', 'nb_avis', 'note_moyenne', 'part_positif',
+                       'part_neutre', 'part_negatif', 'taux_reponse']
+            return [dict(zip(columns, row)) for row in c.fetchall()]
+    except Exception as e:
+        logging.error(f"Erreur lors de la lecture des agrégats '{periode}' : {e}")
+        raise
+    finally:
+        if conn:
+            _release_db_connection(conn)
 
+def rebuild_reviewers_table(batch_size=5000):
+    """
+    Calcule la clé nom_hash des avis qui n'en ont pas encore (avis antérieurs à la table des auteurs),
+    puis reconstruit entièrement 'reviewers' à partir de 'reviews_nickel'.
+    À utiliser une fois après la création de la table sur une base déjà remplie.
+    """
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as c:
+            last_id = 0
+            while True:
+                c.execute("""
+                    SELECT id, nom FROM reviews_nickel
+                    WHERE nom_hash IS NULL AND id > %s
+                    ORDER BY id
+                    LIMIT %s;
+                """, (last_id, batch_size))
+                rows = c.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0] # Les avis sans nom gardent un nom_hash NULL : on avance par id
+                keyed_rows = [(review_id, _reviewer_key(nom)) for review_id, nom in rows]
+                execute_values(c, """
+                    UPDATE reviews_nickel AS r SET nom_hash = v.nom_hash
+                    FROM (VALUES %s) AS v(id, nom_hash)
+                    WHERE r.id = v.id;
+                """, [row for row in keyed_rows if row[1]], page_size=batch_size)
+
+            c.execute("TRUNCATE reviewers;")
+            c.execute("""
+                INSERT INTO reviewers (nom_hash, cible, nom, nombre_avis, premiere_apparition, derniere_apparition,
+                       nb_avis_collectes, nb_avis_sur_invitation)
+                SELECT nom_hash, cible,
+                       (array_agg(nom ORDER BY date_publication DESC NULLS LAST, id DESC))[1],
+                       (array_agg(nombre_avis ORDER BY date_publication DESC NULLS LAST, id DESC))[1],
+                       MIN(date_publication),
+                       MAX(date_publication),
+                       COUNT(*),
+                       COUNT(*) FILTER (WHERE avis_sur_invitation)
+                FROM reviews_nickel
+                WHERE nom_hash IS NOT NULL
+                GROUP BY nom_hash, cible;
+            """)
+        conn.commit()
+        logging.info("Table des auteurs d'avis reconstruite.")
     except Exception as e:
-        logging.error(f"Erreur lors de l'insertion de l'avis avec hash '{review_data.get('contenu_hash')}': {e}")
+        logging.error(f"Erreur lors de la reconstruction de la table des auteurs : {e}")
         if conn:
-            conn.rollback() # Annuler en cas d'erreur
-        raise # Rélève l'exception
+            _rollback(conn)
+        raise
+    finally:
+        if conn:
+            _release_db_connection(conn)
+
+def get_reviewer(nom, cible=None):
+    """
+    Lit le profil d'un auteur d'avis (recherche par clé, sans parcourir 'reviews_nickel').
+
+    Args:
+        cible (str, optional): Entreprise ; par défaut, profil toutes entreprises confondues
+            (cible vaut alors None, nom et nombre_avis sont ceux de l'avis le plus récent).
+
+    Returns:
+        dict: Les colonnes de 'reviewers', ou None si l'auteur est inconnu.
+    """
+    nom_hash = _reviewer_key(nom)
+    if nom_hash is None:
+        return None
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as c:
+            c.execute("""
+                SELECT nom_hash, CASE WHEN COUNT(*) = 1 THEN MIN(cible) END,
+                       (array_agg(nom ORDER BY derniere_apparition DESC NULLS LAST))[1],
+                       (array_agg(nombre_avis ORDER BY derniere_apparition DESC NULLS LAST))[1],
+                       MIN(premiere_apparition), MAX(derniere_apparition),
+                       SUM(nb_avis_collectes), SUM(nb_avis_sur_invitation)
+                FROM reviewers
+                WHERE nom_hash = %(nom_hash)s AND (%(cible)s::text IS NULL OR cible = %(cible)s)
+                GROUP BY nom_hash;
+            """, {'nom_hash': nom_hash, 'cible': cible})
+            row = c.fetchone()
+            return dict(zip(REVIEWER_COLUMNS, row)) if row else None
+    except Exception as e:
+        logging.error(f"Erreur lors de la lecture de l'auteur '{nom}' : {e}")
+        raise
+    finally:
+        if conn:
+            _release_db_connection(conn)
+
+def get_top_reviewers(order_by='nb_avis_collectes', limit=20, min_avis_collectes=1, cible=None):
+    """
+    Liste les auteurs les plus actifs : auteurs récurrents (order_by='nb_avis_collectes', avis collectés
+    sur l'entreprise) ou comptes prolifiques (order_by='nombre_avis', avis publiés sur Trustpilot).
+    Sans cible, un auteur actif sur plusieurs entreprises apparaît une fois par entreprise.
+
+    Returns:
+        list: Dictionnaires des colonnes de 'reviewers', plus 'part_sur_invitation'.
+    """
+    order_clause = REVIEWER_ORDERINGS[order_by]
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as c:
+            c.execute(f"""
+                SELECT {', '.join(REVIEWER_COLUMNS)},
+                       nb_avis_sur_invitation::float / NULLIF(nb_avis_collectes, 0)
+                FROM reviewers
+                WHERE (%(cible)s::text IS NULL OR cible = %(cible)s)
+                  AND nb_avis_collectes >= %(min_avis_collectes)s
+                ORDER BY {order_clause}
+                LIMIT %(limit)s;
+            """, {'cible': cible, 'min_avis_collectes': min_avis_collectes, 'limit': limit})
+            return [dict(zip([*REVIEWER_COLUMNS, 'part_sur_invitation'], row)) for row in c.fetchall()]
+    except Exception as e:
+        logging.error(f"Erreur lors de la lecture des auteurs les plus actifs : {e}")
+        raise
+    finally:
+        if conn:
+            _release_db_connection(conn)
+
+def get_reviewer_reviews(nom, cible=None):
+    """
+    Liste les avis d'un auteur, du plus récent au plus ancien (via l'index sur nom_hash),
+    sur une entreprise ou (par défaut) sur toutes.
+
+    Returns:
+        list: Dictionnaires (id, cible, date_publication, note_avis, avis_sur_invitation, contenu_avis).
+    """
+    nom_hash = _reviewer_key(nom)
+    if nom_hash is None:
+        return []
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as c:
+            c.execute("""
+                SELECT id, cible, date_publication, note_avis, avis_sur_invitation, contenu_avis
+                FROM reviews_nickel
+                WHERE nom_hash = %(nom_hash)s AND (%(cible)s::text IS NULL OR cible = %(cible)s)
+                ORDER BY date_publication DESC NULLS LAST;
+            """, {'nom_hash': nom_hash, 'cible': cible})
+            columns = ['id', 'cible', 'date_publication', 'note_avis', 'avis_sur_invitation', 'contenu_avis']
+            return [dict(zip(columns, row)) for row in c.fetchall()]
+    except Exception as e:
+        logging.error(f"Erreur lors de la lecture des avis de l'auteur '{nom}' : {e}")
+        raise
     finally:
         if conn:
-            conn.close() # Ferme la connexion
+            _release_db_connection(conn)
 
 
 #########################################################
@@ -0,0 +1,138 @@
+# modules/enrichment.py
+
+import logging
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from . import config
+from . import database
+from .review_parser import TITLE_PREFIX
+
+
+# Colonnes écrites par l'enrichissement, dans l'ordre des valeurs de la mise à jour en masse
+ENRICHMENT_COLUMNS = ['longueur_avis', 'langue_detectee', *config.ENRICHMENT_THEMES, 'score_sentiment_lexique']
+
+
+def _tokenize(texts):
+    """Découpe une série de textes en mots (une ligne par mot, indexée par l'avis d'origine)."""
+    return texts.str.lower().str.findall(r"\w+").explode().dropna()
+
+
+def detect_language(texts):
+    """
+    Détecte la langue de chaque texte en comptant les mots-outils de chaque langue.
+    Retourne une série de codes de langue (None si aucun mot-outil n'est reconnu).
+    """
+    words = _tokenize(texts)
+    counts = pd.DataFrame({
+        langue: words.isin(mots_outils).groupby(level=0).sum()
+        for langue, mots_outils in config.ENRICHMENT_STOPWORDS.items()
+    }).reindex(texts.index, fill_value=0)
+    langues = counts.idxmax(axis=1)
+    return langues.where(counts.max(axis=1) > 0, None)
+
+
+def lexicon_sentiment(texts):
+    """
+    Score de sentiment lexical entre -1 (négatif) et 1 (positif) pour chaque texte :
+    moyenne des polarités des mots reconnus, inversées lorsqu'elles suivent une négation.
+    Retourne 0 pour les textes sans mot reconnu.
+    """
+    words = _tokenize(texts)
+    polarity = words.map(config.ENRICHMENT_SENTIMENT_LEXICON)
+    by_review = words.groupby(level=0)
+    previous = by_review.shift(1)
+    # "plus" n'est une négation qu'avec un "ne" dans les deux mots qui le précèdent
+    ne_negation = previous.isin(config.ENRICHMENT_NE_NEGATIONS) & (
+        by_review.shift(2).isin(config.ENRICHMENT_NE_PARTICLES) | by_review.shift(3).isin(config.ENRICHMENT_NE_PARTICLES)
+    )
+    negated = previous.isin(config.ENRICHMENT_NEGATIONS) | ne_negation
+    polarity = polarity * np.where(negated, -1, 1)
+    scores = polarity.groupby(level=0).mean()
+    return scores.reindex(texts.index).fillna(0.0).astype(float)
+
+
+def compute_features(reviews):
+    """
+    Calcule les caractéristiques textuelles d'un lot d'avis, de façon vectorisée.
+
+    Args:
+        reviews (pandas.DataFrame): Colonnes 'id' et 'contenu_avis'.
+
+    Returns:
+        pandas.DataFrame: Colonne 'id' suivie des colonnes de ENRICHMENT_COLUMNS.
+    """
+    texts = reviews['contenu_avis'].fillna('').str.removeprefix(TITLE_PREFIX)
+    lowered = texts.str.lower()
+
+    features = pd.DataFrame({'id': reviews['id']})
+    features['longueur_avis'] = texts.str.len()
+    features['langue_detectee'] = detect_language(texts)
+    for theme, pattern in config.ENRICHMENT_THEMES.items():
+        features[theme] = lowered.str.contains(pattern, regex=True)
+    features['score_sentiment_lexique'] = lexicon_sentiment(texts).round(4)
+    return features
+
+
+def _fetch_batch(cursor, batch_size):
+    """Lit le prochain lot d'avis non encore enrichis."""
+    cursor.execute("""
+        SELECT id, contenu_avis
+        FROM reviews_nickel
+        WHERE date_enrichissement IS NULL
+        ORDER BY id
+        LIMIT %s;
+    """, (batch_size,))
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=['id', 'contenu_avis'])
+
+
+def _write_batch(cursor, features):
+    """Écrit les caractéristiques d'un lot en une seule requête UPDATE ... FROM (VALUES ...)."""
+    assignments = ", ".join(f"{column} = v.{column}" for column in ENRICHMENT_COLUMNS)
+    # Les conversions explicites évitent que PostgreSQL type une colonne entièrement NULL en TEXT
+    template = "(%s, %s, %s::varchar, " + ", ".join(["%s::boolean"] * len(config.ENRICHMENT_THEMES)) + ", %s::real)"
+    rows = [
+        tuple(None if pd.isna(value) else value.item() if hasattr(value, 'item') else value for value in row)
+        for row in features[['id', *ENRICHMENT_COLUMNS]].itertuples(index=False, name=None)
+    ]
+    execute_values(cursor, f"""
+        UPDATE reviews_nickel AS r
+        SET {assignments}, date_enrichissement = NOW()
+        FROM (VALUES %s) AS v(id, {', '.join(ENRICHMENT_COLUMNS)})
+        WHERE r.id = v.id;
+    """, rows, template=template, page_size=len(rows))
+
+
+def run_enrichment(batch_size=None):
+    """
+    Enrichit, par lots, tous les avis qui ne l'ont pas encore été.
+    Étape séparée, à lancer après l'ingestion : elle ne ralentit pas le scraping.
+
+    Returns:
+        int: Le nombre d'avis enrichis.
+    """
+    batch_size = batch_size or config.ENRICHMENT_BATCH_SIZE
+    total = 0
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            while True:
+                batch = _fetch_batch(c, batch_size)
+                if batch.empty:
+                    break
+                _write_batch(c, compute_features(batch))
+                conn.commit() # Un commit par lot : un arrêt en cours de route ne perd que le lot courant
+                total += len(batch)
+                logging.info(f"{len(batch)} avis enrichis ({total} au total).")
+    except Exception as e:
+        logging.error(f"Erreur lors de l'enrichissement des avis : {e}")
+        if conn:
+            database._rollback(conn)
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
+    return total
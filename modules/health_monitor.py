@@ -0,0 +1,136 @@
+# modules/health_monitor.py
+
+import logging
+import os
+import re
+from collections import Counter
+from datetime import datetime
+
+from . import config
+
+
+class SelectorHealthMonitor:
+    """
+    Surveille la santé des sélecteurs du parser pendant un scraping.
+
+    Pour chaque page, compte la part d'avis pour lesquels chaque champ a bien été extrait
+    (une fonction extract_* qui retourne None ou une chaîne vide est un échec). Lorsqu'un taux
+    passe sous son seuil, une alerte est journalisée et un échantillon du HTML brut en échec
+    est sauvegardé pour diagnostic hors ligne.
+    """
+
+    def __init__(self, thresholds=None, sample_dir=None, max_samples=None):
+        self.thresholds = thresholds or config.HEALTH_MIN_SUCCESS_RATES
+        self.sample_dir = sample_dir or config.HEALTH_SAMPLE_DIR
+        self.max_samples = max_samples if max_samples is not None else config.HEALTH_MAX_SAMPLES
+        self.alerts = []
+        self.samples_saved = 0
+        self.selector_failure = False # True si une page contenait des avis mais aucun conteneur (ou aucun avis) reconnu
+        self.run_attempts = Counter()
+        self.run_successes = Counter()
+        self._reset_page()
+
+    def _reset_page(self):
+        self.page_attempts = Counter()
+        self.page_successes = Counter()
+        self.page_failures = {} # champ -> HTML du premier <article> en échec sur la page
+
+    @staticmethod
+    def _is_applicable(field, review_data):
+        """La date de réponse n'est attendue que pour les avis ayant une réponse."""
+        if field == 'date_reponse':
+            return bool(review_data.get('reponse'))
+        return True
+
+    def record_review(self, review_data, review_soup_article):
+        """Enregistre le résultat de l'extraction d'un avis."""
+        for field in self.thresholds:
+            if not self._is_applicable(field, review_data):
+                continue
+            self.page_attempts[field] += 1
+            value = review_data.get(field)
+            if value is None or value == "":
+                # Le HTML est copié : l'arbre de l'avis est libéré (decompose) juste après l'extraction
+                if field not in self.page_failures:
+                    self.page_failures[field] = str(review_soup_article)
+            else:
+                self.page_successes[field] += 1
+
+    def end_page(self, page_url):
+        """
+        Clôt la page courante : calcule les taux d'extraction, alerte et échantillonne
+        les champs sous leur seuil.
+
+        Returns:
+            list: Les champs en dessous de leur seuil sur cette page.
+        """
+        failing_fields = []
+        for field, threshold in self.thresholds.items():
+            attempts = self.page_attempts[field]
+            self.run_attempts[field] += attempts
+            self.run_successes[field] += self.page_successes[field]
+            if attempts < config.HEALTH_MIN_REVIEWS_PER_PAGE:
+                continue # Trop peu d'avis pour que le taux soit significatif
+            rate = self.page_successes[field] / attempts
+            if rate < threshold:
+                failing_fields.append(field)
+                self._alert(f"Champ '{field}' extrait pour {rate:.0%} des avis seulement sur {page_url} (seuil {threshold:.0%}).")
+                self._save_sample(page_url, field, self.page_failures[field])
+        self._reset_page()
+        return failing_fields
+
+    def record_missing_containers(self, page_url, soup):
+        """
+        Appelée quand aucun conteneur d'avis n'est trouvé sur une page. Si la page contient
+        pourtant des balises <article>, les sélecteurs sont probablement cassés (redéploiement
+        de Trustpilot) : ce n'est pas une fin de pagination normale.
+
+        Returns:
+            bool: True si la page semble contenir des avis non reconnus.
+        """
+        if not soup.find('article'):
+            return False
+        self.selector_failure = True
+        self._alert(f"Aucun conteneur d'avis reconnu sur {page_url} alors que la page contient des balises <article> : "
+                    "les sélecteurs du parser sont probablement obsolètes.")
+        self._save_sample(page_url, 'conteneurs', str(soup))
+        return True
+
+    def record_empty_containers(self, page_url, nb_containers, container_html):
+        """
+        Appelée quand des conteneurs d'avis sont trouvés sur une page mais qu'aucun ne contient
+        d'avis exploitable (pas de balise <article>) : la structure interne des cartes a changé.
+        """
+        self.selector_failure = True
+        self._alert(f"{nb_containers} conteneurs d'avis reconnus sur {page_url} mais aucun avis extrait : "
+                    "les sélecteurs du parser sont probablement obsolètes.")
+        self._save_sample(page_url, 'conteneurs', container_html)
+
+    def _alert(self, message):
+        self.alerts.append(message)
+        logging.critical(f"ALERTE SÉLECTEURS : {message}")
+
+    def _save_sample(self, page_url, field, html):
+        """Sauvegarde un échantillon de HTML en échec (dans la limite de max_samples par exécution)."""
+        if self.samples_saved >= self.max_samples:
+            return
+        try:
+            os.makedirs(self.sample_dir, exist_ok=True)
+            page_label = re.sub(r"\W+", "_", page_url.rsplit('/', 1)[-1])
+            file_name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{page_label}_{field}.html"
+            with open(os.path.join(self.sample_dir, file_name), 'w', encoding='utf-8') as f:
+                f.write(f"<!-- {page_url} -->\n{html}")
+            self.samples_saved += 1
+        except OSError as e:
+            logging.error(f"Impossible de sauvegarder l'échantillon HTML en échec : {e}")
+
+    def summary(self):
+        """Résumé textuel (taux d'extraction de chaque champ sur l'exécution et alertes) pour le rapport."""
+        lines = ["Santé des sélecteurs (taux d'extraction sur l'exécution) :"]
+        for field in self.thresholds:
+            attempts = self.run_attempts[field]
+            rate = f"{self.run_successes[field] / attempts:.0%}" if attempts else "n/a"
+            lines.append(f"  - {field}: {rate} ({attempts} avis)")
+        if self.alerts:
+            lines.append(f"{len(self.alerts)} alerte(s), {self.samples_saved} échantillon(s) HTML sauvegardé(s) dans {self.sample_dir}.")
+        return "\n".join(lines)
@@ -0,0 +1,88 @@
+# modules/import_benchmark.py
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from . import config
+
+
+# Ligne produite par python -X importtime : "import time: <propre> | <cumulé> | <indentation><module>"
+# (durées en microsecondes ; l'indentation augmente de 2 espaces par niveau d'import imbriqué)
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(output, module_name):
+    """
+    Analyse la sortie de -X importtime pour un "import module_name".
+
+    Returns:
+        tuple: (durée cumulée de l'import en ms, dict {dépendance directe: durée cumulée en ms}).
+    """
+    root_package = module_name.split('.')[0]
+    total_us = 0
+    dependencies = {}
+    children = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_us, depth, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if depth == 3:
+            children[name] = cumulative_us / 1000
+        elif depth == 1:
+            # Les imports sont listés après leurs dépendances : les lignes de niveau 2 lues
+            # jusqu'ici sont celles de cet import de premier niveau
+            if name == root_package or name.startswith(root_package + '.'):
+                total_us += cumulative_us
+                dependencies.update(children)
+            children = {}
+    return total_us / 1000, dependencies
+
+
+def measure_import_time(module_name, runs=None):
+    """
+    Mesure le temps d'import d'un module dans un interpréteur neuf (médiane de plusieurs exécutions).
+
+    Returns:
+        tuple: (médiane en ms, dépendances directes de la dernière exécution, en ms).
+    """
+    runs = runs or config.IMPORT_TIME_RUNS
+    timings = []
+    dependencies = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {module_name}"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Échec de l'import de {module_name} : {result.stderr.strip().splitlines()[-1]}")
+        total_ms, dependencies = parse_importtime(result.stderr, module_name)
+        timings.append(total_ms)
+    return statistics.median(timings), dependencies
+
+
+def check_import_budgets(budgets=None, runs=None, top=3):
+    """
+    Compare le temps d'import de chaque module à son budget (IMPORT_TIME_BUDGETS_MS).
+
+    Returns:
+        tuple: (rapport textuel, True si tous les budgets sont respectés).
+    """
+    budgets = budgets or config.IMPORT_TIME_BUDGETS_MS
+    lines = []
+    all_ok = True
+    for module_name, budget_ms in budgets.items():
+        median_ms, dependencies = measure_import_time(module_name, runs)
+        ok = median_ms <= budget_ms
+        all_ok = all_ok and ok
+        heaviest = sorted(dependencies.items(), key=lambda item: -item[1])[:top]
+        detail = ", ".join(f"{name} {duration:.0f} ms" for name, duration in heaviest)
+        lines.append(f"  - {module_name}: {median_ms:.0f} ms (budget {budget_ms} ms) {'OK' if ok else 'DÉPASSÉ'}"
+                     + (f" [{detail}]" if detail else ""))
+    verdict = "Tous les budgets sont respectés." if all_ok else "ÉCHEC : au moins un budget d'import est dépassé."
+    return "Temps d'import (médiane) :\n" + "\n".join(lines) + "\n" + verdict, all_ok
@@ -0,0 +1,208 @@
+# modules/mock_server.py
+
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from . import config
+from .page_archive import PageArchive
+
+
+# Gabarit d'un avis reprenant la structure HTML attendue par review_parser
+REVIEW_CARD_TEMPLATE = """<div class="styles_cardWrapper__g8amG styles_show__Z8n7u"><article>
+<div><div><div><time datetime="{date_publication}">{date_publication}</time></div>
+<aside><div><a href="/users/{user_id}"><span>{nom}</span></a><span data-consumer-reviews-count-typography="true">{nombre_avis}<!-- --> avis</span><span data-consumer-country-typography="true">FR</span></div></aside></div>
+<section><img alt="Noté {note} sur 5 étoiles"/>{invitation}
+<div class="styles_reviewContent__tuXiN"><a href="/reviews/{user_id}"><h2>{titre}</h2></a><p class="CDS_Typography_appearance-default__bedfe1 CDS_Typography_body-l__bedfe1">{contenu}</p>
+<p data-service-review-date-of-experience-typography="true">Date de l'expérience: <span class="CDS_Typography_appearance-subtle__bedfe1">{date_experience}</span></p></div></section>
+{reponse}</div></article></div>"""
+
+INVITATION_TEMPLATE = '<div data-name="review-label-tooltip-trigger">Sur invitation</div>'
+REPLY_TEMPLATE = ('<div class="styles_replyInfo__41_in"><time datetime="{date_reponse}">{date_reponse}</time></div>'
+                  '<div class="styles_content__eJmhl">Bonjour, merci pour votre retour.</div>')
+
+MOIS_FR = ['janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet',
+           'août', 'septembre', 'octobre', 'novembre', 'décembre']
+SYNTHETIC_PHRASES = {
+    1: "Carte bloquée depuis une semaine, service client injoignable.",
+    2: "Frais trop élevés et compte clôturé sans explication.",
+    3: "Service correct mais l'application est parfois lente.",
+    4: "Bonne banque, ouverture de compte rapide en bureau de tabac.",
+    5: "Super service, très simple et rapide, je recommande.",
+}
+
+
+def synthetic_page(page, reviews_per_page=None, seed=None):
+    """
+    Génère une page d'avis fictive, déterministe pour un numéro de page et une graine donnés.
+    Les avis sont uniques d'une page à l'autre et de plus en plus anciens, comme sur Trustpilot.
+    """
+    reviews_per_page = reviews_per_page or config.MOCK_SERVER_REVIEWS_PER_PAGE
+    seed = config.MOCK_SERVER_SEED if seed is None else seed
+    rng = random.Random(f"{seed}-{page}")
+    newest = datetime(2025, 1, 1) - timedelta(hours=12 * reviews_per_page * (page - 1))
+
+    cards = []
+    for position in range(reviews_per_page):
+        index = (page - 1) * reviews_per_page + position
+        published = newest - timedelta(hours=12 * position, minutes=rng.randrange(60))
+        experience = published - timedelta(days=rng.randrange(1, 10))
+        note = rng.choices([1, 2, 3, 4, 5], weights=[20, 5, 5, 15, 55])[0]
+        reponse = ""
+        if rng.random() < 0.6:
+            reponse = REPLY_TEMPLATE.format(date_reponse=(published + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%S.000Z'))
+        cards.append(REVIEW_CARD_TEMPLATE.format(
+            date_publication=published.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            user_id=index,
+            nom=f"Client {rng.randrange(100000)}",
+            nombre_avis=rng.randint(1, 40),
+            note=note,
+            invitation=INVITATION_TEMPLATE if rng.random() < 0.5 else "",
+            titre=f"Avis {index}",
+            contenu=f"{SYNTHETIC_PHRASES[note]} (avis n°{index})",
+            date_experience=f"{experience.day} {MOIS_FR[experience.month - 1]} {experience.year}",
+            reponse=reponse,
+        ))
+    return f"<html><body><main>{''.join(cards)}</main></body></html>"
+
+
+def _load_recorded_pages(archive_dir):
+    """Retourne les pages archivées, indexées par numéro de page (la dernière version de chaque page)."""
+    recorded = {}
+    for page_url, _, html in PageArchive(archive_dir).iter_pages():
+        match = re.search(r"[?&]page=(\d+)", page_url)
+        if match:
+            recorded[int(match.group(1))] = html
+    return [recorded[page] for page in sorted(recorded)]
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    """Répond aux requêtes GET .../?page=N à partir de la configuration du MockTrustpilotServer."""
+
+    def do_GET(self):
+        mock = self.server.mock
+        status, headers, body = mock.respond(self.path)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        payload = body.encode('utf-8')
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Serveur de test : {format % args}")
+
+
+class MockTrustpilotServer:
+    """
+    Serveur HTTP local qui imite les pages d'avis Trustpilot (même schéma d'URL "?page=N"),
+    pour mesurer le débit du scraper hors ligne et de façon reproductible.
+
+    Les pages servies sont les pages enregistrées par l'archive (si archive_dir est fourni)
+    ou des pages fictives générées. Au-delà de la dernière page, le serveur répond 404.
+    La latence, le taux d'erreurs 5xx et le taux de réponses 429 (avec Retry-After) sont
+    configurables ; les tirages aléatoires sont faits avec une graine fixe.
+    """
+
+    def __init__(self, host=None, port=None, pages=None, latency=None, latency_jitter=None,
+                 error_rate=None, rate_limit_rate=None, archive_dir=None, seed=None):
+        self.host = host or config.MOCK_SERVER_HOST
+        self.port = config.MOCK_SERVER_PORT if port is None else port
+        self.latency = config.MOCK_SERVER_LATENCY if latency is None else latency
+        self.latency_jitter = config.MOCK_SERVER_LATENCY_JITTER if latency_jitter is None else latency_jitter
+        self.error_rate = config.MOCK_SERVER_ERROR_RATE if error_rate is None else error_rate
+        self.rate_limit_rate = config.MOCK_SERVER_RATE_LIMIT_RATE if rate_limit_rate is None else rate_limit_rate
+        self.seed = config.MOCK_SERVER_SEED if seed is None else seed
+
+        self.recorded_pages = _load_recorded_pages(archive_dir) if archive_dir else []
+        if archive_dir and not self.recorded_pages:
+            raise ValueError(f"Aucune page archivée trouvée dans {archive_dir}.")
+        # Avec des pages enregistrées, elles sont resservies en boucle si pages dépasse leur nombre
+        self.pages = pages or len(self.recorded_pages) or config.MOCK_SERVER_PAGES
+
+        self.status_counts = Counter()
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """URL de base à passer au scraper (se termine par "?page=")."""
+        return f"http://{self.host}:{self.port}/review/nickel.eu?page="
+
+    def page_html(self, page):
+        """Retourne le HTML de la page demandée, ou None si elle n'existe pas."""
+        if not 1 <= page <= self.pages:
+            return None
+        if self.recorded_pages:
+            return self.recorded_pages[(page - 1) % len(self.recorded_pages)]
+        return synthetic_page(page, seed=self.seed)
+
+    def respond(self, path):
+        """
+        Calcule la réponse à une requête.
+
+        Returns:
+            tuple: (code HTTP, en-têtes supplémentaires, corps).
+        """
+        with self._lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.latency_jitter, self.latency_jitter))
+            draw = self._rng.random()
+        time.sleep(delay)
+
+        query = parse_qs(urlsplit(path).query)
+        try:
+            page = int(query.get('page', ['1'])[0])
+        except ValueError:
+            page = 0
+
+        if draw < self.rate_limit_rate:
+            response = (429, {'Retry-After': str(config.MOCK_SERVER_RETRY_AFTER)}, "Too Many Requests")
+        elif draw < self.rate_limit_rate + self.error_rate:
+            response = (503, {}, "Service Unavailable")
+        else:
+            html = self.page_html(page)
+            response = (200, {}, html) if html is not None else (404, {}, "Not Found")
+
+        with self._lock:
+            self.status_counts[response[0]] += 1
+        return response
+
+    def start(self):
+        """Démarre le serveur dans un thread d'arrière-plan et retourne son URL de base."""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _MockRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self.port = self._httpd.server_address[1] # Port réellement attribué si port=0
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info(f"Serveur de test démarré sur {self.base_url} ({self.pages} pages).")
+        return self.base_url
+
+    def stop(self):
+        """Arrête le serveur et journalise le nombre de réponses par code HTTP."""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+            logging.info(f"Serveur de test arrêté. Réponses par code HTTP : {dict(self.status_counts)}")
+
+    def serve_forever(self):
+        """Démarre le serveur et bloque jusqu'à une interruption clavier."""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
@@ -0,0 +1,240 @@
+# modules/near_duplicates.py
+
+import hashlib
+import logging
+import re
+import unicodedata
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from . import config
+from . import database
+from .review_parser import TITLE_PREFIX
+
+
+# Les permutations MinHash sont des fonctions (a * x + b) mod P avec P premier de Mersenne 2^31 - 1 :
+# les produits restent inférieurs à 2^62 et tiennent dans un int64 numpy.
+MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(config.NEAR_DUPLICATE_SEED)
+_PERM_A = _rng.integers(1, MERSENNE_PRIME, size=config.NEAR_DUPLICATE_NUM_PERM, dtype=np.int64)
+_PERM_B = _rng.integers(0, MERSENNE_PRIME, size=config.NEAR_DUPLICATE_NUM_PERM, dtype=np.int64)
+
+# La signature est découpée en bandes de ROWS_PER_BAND valeurs. Deux avis dont au moins une bande
+# est identique sont candidats (LSH) : la recherche se fait par égalité sur une table indexée,
+# sans comparer toutes les paires d'avis.
+ROWS_PER_BAND = config.NEAR_DUPLICATE_NUM_PERM // config.NEAR_DUPLICATE_BANDS
+
+
+def normalize_text(text):
+    """
+    Normalise le texte d'un avis pour la comparaison : minuscules, accents et ponctuation
+    supprimés, espaces multiples réduits à un seul.
+    """
+    text = (text or "").removeprefix(TITLE_PREFIX).lower()
+    text = unicodedata.normalize('NFKD', text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _shingle_hashes(text):
+    """Hash (31 bits) de l'ensemble des n-grammes de caractères d'un texte normalisé."""
+    size = config.NEAR_DUPLICATE_SHINGLE_SIZE
+    shingles = {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+    return np.array([
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'big') % MERSENNE_PRIME
+        for shingle in shingles
+    ], dtype=np.int64)
+
+
+def minhash_signature(text):
+    """
+    Calcule la signature MinHash (NEAR_DUPLICATE_NUM_PERM entiers) du texte normalisé.
+    Retourne None si le texte normalisé est trop court pour être comparé de façon fiable.
+    """
+    normalized = normalize_text(text)
+    if len(normalized) < config.NEAR_DUPLICATE_MIN_LENGTH:
+        return None
+    hashes = _shingle_hashes(normalized)
+    # Toutes les permutations sont appliquées d'un coup : matrice (permutations x n-grammes)
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimation de la similarité de Jaccard : part des positions égales des deux signatures."""
+    return float(np.mean(np.asarray(signature_a) == np.asarray(signature_b)))
+
+
+def _band_keys(signature):
+    """Retourne les clés (bande, valeur) de la signature, une par bande (valeur = hash 64 bits signé)."""
+    keys = []
+    for band in range(config.NEAR_DUPLICATE_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(np.asarray(rows, dtype=np.int64).tobytes(), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return keys
+
+
+def _fetch_indexed(cursor, band_keys):
+    """
+    Retourne, pour chaque clé (bande, valeur) demandée, les avis indexés qui la partagent :
+    {clé: [(review_id, signature, cluster_id, cible), ...]}. Une seule requête pour toutes les clés.
+    """
+    indexed = {}
+    if not band_keys:
+        return indexed
+    # Jointure sur des tableaux plutôt qu'un IN (...) : un lot de 1000 avis compte 16 000 clés
+    bands, values = zip(*band_keys)
+    cursor.execute("""
+        SELECT b.bande, b.valeur, m.review_id, m.signature, m.cluster_id, r.cible
+        FROM unnest(%s::smallint[], %s::bigint[]) AS k(bande, valeur)
+        JOIN reviews_minhash_bandes b ON b.bande = k.bande AND b.valeur = k.valeur
+        JOIN reviews_minhash m ON m.review_id = b.review_id
+        JOIN reviews_nickel r ON r.id = m.review_id;
+    """, (list(bands), list(values)))
+    for bande, valeur, review_id, signature, cluster_id, cible in cursor.fetchall():
+        indexed.setdefault((bande, valeur), []).append((review_id, signature, cluster_id, cible))
+    return indexed
+
+
+def _rank_candidates(signature, band_keys, indexed, threshold, cible=None):
+    """
+    Retourne les (review_id, similarite, cluster_id) des avis partageant une bande avec la
+    signature dont la similarité estimée atteint le seuil, du plus similaire au moins similaire.
+    Si cible est fournie, seuls les avis de cette entreprise sont retenus.
+    """
+    entries = {}
+    for key in band_keys:
+        for review_id, stored_signature, cluster_id, stored_cible in indexed.get(key, ()):
+            if cible is None or stored_cible == cible:
+                entries[review_id] = (stored_signature, cluster_id)
+    candidates = []
+    for review_id, (stored_signature, cluster_id) in entries.items():
+        similarity = estimated_similarity(signature, stored_signature)
+        if similarity >= threshold:
+            candidates.append((review_id, similarity, cluster_id))
+    return sorted(candidates, key=lambda candidate: (-candidate[1], candidate[0]))
+
+
+def _find_candidates(cursor, signature, threshold, cible=None):
+    """Recherche en base les quasi-doublons indexés d'une signature (voir _rank_candidates)."""
+    band_keys = _band_keys(signature)
+    return _rank_candidates(signature, band_keys, _fetch_indexed(cursor, band_keys), threshold, cible)
+
+
+def index_reviews(cursor, reviews):
+    """
+    Indexe des avis nouvellement insérés et les rattache au groupe de leur plus proche
+    quasi-doublon déjà indexé de la même entreprise. Doit être appelée dans la transaction d'insertion.
+    Le lot entier coûte trois requêtes : lecture des candidats, écriture des signatures et des bandes.
+
+    Args:
+        cursor: Curseur psycopg2 de la transaction en cours.
+        reviews (iterable): Tuples (id, contenu_avis, cible).
+
+    Returns:
+        list: Tuples (review_id, cluster_id) des avis détectés comme quasi-doublons.
+    """
+    signed = []
+    for review_id, contenu_avis, cible in reviews:
+        signature = minhash_signature(contenu_avis)
+        if signature is not None:
+            signed.append((review_id, signature, _band_keys(signature), cible))
+    if not signed:
+        return []
+
+    indexed = _fetch_indexed(cursor, {key for _, _, band_keys, _ in signed for key in band_keys})
+    near_duplicates = []
+    signature_rows = []
+    band_rows = []
+    for review_id, signature, band_keys, cible in signed:
+        candidates = _rank_candidates(signature, band_keys, indexed, config.NEAR_DUPLICATE_THRESHOLD, cible)
+        cluster_id = candidates[0][2] if candidates else review_id
+        if candidates:
+            near_duplicates.append((review_id, cluster_id))
+            logging.info(f"Avis {review_id} quasi-doublon de l'avis {candidates[0][0]} (similarité {candidates[0][1]:.2f}).")
+
+        signature_rows.append((review_id, signature.tolist(), cluster_id))
+        band_rows.extend((bande, valeur, review_id) for bande, valeur in band_keys)
+        # Les avis du même lot sont indexés dans l'ordre : les suivants voient celui-ci
+        for key in band_keys:
+            indexed.setdefault(key, []).append((review_id, signature, cluster_id, cible))
+
+    execute_values(cursor, """
+        INSERT INTO reviews_minhash (review_id, signature, cluster_id)
+        VALUES %s
+        ON CONFLICT (review_id) DO NOTHING;
+    """, signature_rows)
+    execute_values(cursor, """
+        INSERT INTO reviews_minhash_bandes (bande, valeur, review_id)
+        VALUES %s
+        ON CONFLICT DO NOTHING;
+    """, band_rows, page_size=1000)
+    return near_duplicates
+
+
+def build_index(batch_size=1000):
+    """
+    Indexe les avis déjà en base qui ne le sont pas encore (à lancer une fois après
+    la création des tables de l'index sur une base existante).
+
+    Returns:
+        int: Le nombre d'avis détectés comme quasi-doublons.
+    """
+    total_duplicates = 0
+    last_id = 0
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            while True:
+                c.execute("""
+                    SELECT r.id, r.contenu_avis, r.cible
+                    FROM reviews_nickel r
+                    LEFT JOIN reviews_minhash m ON m.review_id = r.id
+                    WHERE m.review_id IS NULL AND r.id > %s
+                    ORDER BY r.id
+                    LIMIT %s;
+                """, (last_id, batch_size))
+                rows = c.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0] # Les avis trop courts ne sont pas indexés : on avance par id
+                total_duplicates += len(index_reviews(c, rows))
+                conn.commit()
+        logging.info(f"Index des quasi-doublons construit : {total_duplicates} quasi-doublons détectés.")
+    except Exception as e:
+        logging.error(f"Erreur lors de la construction de l'index des quasi-doublons : {e}")
+        if conn:
+            database._rollback(conn)
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
+    return total_duplicates
+
+
+def find_near_duplicates(text, threshold=None, cible=None):
+    """
+    Recherche les avis indexés proches d'un texte donné (parmi ceux d'une entreprise si cible est fournie).
+
+    Returns:
+        list: Tuples (review_id, similarite, cluster_id), du plus similaire au moins similaire.
+    """
+    if threshold is None:
+        threshold = config.NEAR_DUPLICATE_THRESHOLD
+    signature = minhash_signature(text)
+    if signature is None:
+        return []
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            return _find_candidates(c, signature, threshold, cible)
+    except Exception as e:
+        logging.error(f"Erreur lors de la recherche de quasi-doublons : {e}")
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
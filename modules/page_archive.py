@@ -0,0 +1,107 @@
+# modules/page_archive.py
+
+import glob
+import json
+import logging
+import mmap
+import os
+import zlib
+from datetime import datetime
+
+from . import config
+
+
+class PageArchive:
+    """
+    Archive append-only des pages HTML brutes récupérées par le scraper.
+
+    Les pages sont compressées une à une et ajoutées à la suite dans des fichiers segments
+    (segment_000001.dat, ...). Chaque segment a un index (segment_000001.idx, une ligne JSON
+    par page : url, date de récupération, position et taille dans le segment). Un nouveau segment
+    est ouvert lorsque le segment courant dépasse ARCHIVE_SEGMENT_MAX_BYTES.
+    La relecture se fait par mmap : les pages sont décompressées au fil de l'eau, sans réseau.
+    """
+
+    def __init__(self, archive_dir=None, segment_max_bytes=None):
+        self.archive_dir = archive_dir or config.ARCHIVE_DIR
+        self.segment_max_bytes = segment_max_bytes or config.ARCHIVE_SEGMENT_MAX_BYTES
+        self._data_file = None
+        self._index_file = None
+
+    def _segment_numbers(self):
+        paths = glob.glob(os.path.join(self.archive_dir, 'segment_*.dat'))
+        return sorted(int(os.path.basename(path)[len('segment_'):-len('.dat')]) for path in paths)
+
+    def _segment_paths(self, number):
+        base = os.path.join(self.archive_dir, f"segment_{number:06d}")
+        return base + '.dat', base + '.idx'
+
+    def _open_segment_for_append(self):
+        """Ouvre le dernier segment en ajout, ou un nouveau segment s'il est plein."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        numbers = self._segment_numbers()
+        number = numbers[-1] if numbers else 1
+        data_path, index_path = self._segment_paths(number)
+        if os.path.exists(data_path) and os.path.getsize(data_path) >= self.segment_max_bytes:
+            number += 1
+            data_path, index_path = self._segment_paths(number)
+            logging.info(f"Nouveau segment d'archive : {data_path}")
+        self._data_file = open(data_path, 'ab')
+        self._index_file = open(index_path, 'a', encoding='utf-8')
+
+    def append(self, page_url, html, fetched_at):
+        """
+        Ajoute une page à l'archive.
+
+        Args:
+            page_url (str): L'URL de la page.
+            html (str): Le HTML brut de la page.
+            fetched_at (datetime): L'horodatage de récupération.
+        """
+        if self._data_file is None or self._data_file.tell() >= self.segment_max_bytes:
+            self.close()
+            self._open_segment_for_append()
+
+        compressed = zlib.compress(html.encode('utf-8'), config.ARCHIVE_COMPRESSION_LEVEL)
+        offset = self._data_file.tell()
+        self._data_file.write(compressed)
+        self._data_file.flush()
+        # L'index est écrit après les données : une page n'est visible qu'une fois entièrement écrite
+        self._index_file.write(json.dumps({
+            'url': page_url,
+            'date_scraping': fetched_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'offset': offset,
+            'length': len(compressed),
+        }) + "\n")
+        self._index_file.flush()
+
+    def iter_pages(self):
+        """
+        Parcourt les pages archivées, dans l'ordre d'archivage.
+
+        Yields:
+            tuple: (page_url, date_scraping (datetime), html).
+        """
+        for number in self._segment_numbers():
+            data_path, index_path = self._segment_paths(number)
+            if not os.path.exists(index_path) or os.path.getsize(data_path) == 0:
+                continue
+            with open(data_path, 'rb') as data_file, open(index_path, encoding='utf-8') as index_file:
+                with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+                    for line in index_file:
+                        entry = json.loads(line)
+                        compressed = segment[entry['offset']:entry['offset'] + entry['length']]
+                        yield (
+                            entry['url'],
+                            datetime.strptime(entry['date_scraping'], '%Y-%m-%d %H:%M:%S'),
+                            zlib.decompress(compressed).decode('utf-8'),
+                        )
+
+    def close(self):
+        """Ferme le segment en cours d'écriture."""
+        if self._data_file:
+            self._data_file.close()
+            self._data_file = None
+        if self._index_file:
+            self._index_file.close()
+            self._index_file = None
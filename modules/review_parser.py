@@ -6,6 +6,10 @@ import logging
 from . import config 
 
 
+# Préfixe du contenu d'un avis sans paragraphe principal (extract_review_content se rabat sur le titre)
+TITLE_PREFIX = "Titre: "
+
+
 def extract_publication_date(review_soup_article):
     """
     Extrait la date de publication en utilisant le XPath.
@@ -62,9 +66,6 @@ def extract_reviewer_name(review_soup_article):
 #         print(f"Erreur lors de l'extraction de nombre_avis : {e}")
 #         return None
 
-import re
-import logging # Assurez-vous que logging est importé en haut de review_parser.py
-
 def extract_num_reviews(review_soup_article):
     """
     Extrait le nombre d'avis de l'utilisateur.
@@ -185,11 +186,6 @@ def extract_review_rating(review_soup_article):
 #         return None, None, None, None
 
 
-import re
-import logging
-from datetime import datetime
-from . import config # Assurez-vous d'importer config pour MOIS_MAPPING
-
 def extract_experience_date(review_soup_article):
     """
     Extrait la date d'expérience de l'avis en utilisant des sélecteurs plus robustes.
@@ -316,7 +312,7 @@ def extract_review_content(review_soup_article):
     if content:
         return content
     elif title:
-        return "Titre: " + title
+        return TITLE_PREFIX + title
     return ""
 
 # def extract_review_title(review_soup_article):
@@ -0,0 +1,155 @@
+# modules/run_history.py
+
+import json
+import logging
+import os
+import statistics
+from datetime import datetime
+
+from . import config
+
+
+STAGES = ('telechargement', 'analyse', 'stockage')
+
+
+def _ratio(numerator, denominator, digits=4):
+    return round(numerator / denominator, digits) if denominator else None
+
+
+def build_run_record(mode, reports, duration, base_urls):
+    """
+    Agrège les RunReport d'une exécution (un par cible) en un enregistrement d'historique.
+
+    Returns:
+        dict: Volumes, durées par étape et indicateurs de débit dérivés.
+    """
+    pages = sum(report.nb_pages for report in reports)
+    pages_fetched = sum(report.pages_fetched for report in reports)
+    fetch_errors = sum(report.fetch_errors for report in reports)
+    missing_pages = sum(report.missing_pages for report in reports)
+    requests_sent = pages_fetched + fetch_errors + missing_pages
+    reviews = sum(report.reviews_parsed for report in reports)
+    stage_seconds = {stage: round(sum(report.stage_seconds[stage] for report in reports), 4) for stage in STAGES}
+
+    record = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'mode': mode,
+        'base_urls': sorted(base_urls),
+        'duree_secondes': round(duration, 4),
+        'pages': pages,
+        'pages_telechargees': pages_fetched,
+        'avis_extraits': reviews,
+        'avis_nouveaux': sum(report.total_new_reviews for report in reports),
+        'avis_mis_a_jour': sum(report.total_updated_reviews for report in reports),
+        'octets_telecharges': sum(report.bytes_fetched for report in reports),
+        'erreurs_requetes': fetch_errors,
+        'pages_introuvables': missing_pages, # 404 de fin de pagination, exclues du taux d'erreurs
+        'secondes_par_etape': stage_seconds,
+        'pages_par_seconde': _ratio(pages, duration),
+        'avis_par_seconde': _ratio(reviews, duration),
+        'taux_erreurs_requetes': _ratio(fetch_errors, requests_sent),
+    }
+    # Latence moyenne par page de chaque étape (la dernière page, vide, est téléchargée mais pas stockée)
+    record['secondes_par_page_telechargement'] = _ratio(stage_seconds['telechargement'], requests_sent)
+    record['secondes_par_page_analyse'] = _ratio(stage_seconds['analyse'], pages_fetched)
+    record['secondes_par_page_stockage'] = _ratio(stage_seconds['stockage'], pages)
+    return record
+
+
+def record_run(mode, reports, duration, base_urls, path=None):
+    """
+    Ajoute une exécution à l'historique (une ligne JSON). Un échec d'écriture est journalisé
+    sans interrompre le scraping, dont les avis sont déjà en base.
+
+    Returns:
+        dict: L'enregistrement ajouté.
+    """
+    path = path or config.RUN_HISTORY_PATH
+    record = build_run_record(mode, reports, duration, base_urls)
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logging.error(f"Impossible d'enregistrer l'exécution dans l'historique {path} : {e}")
+    return record
+
+
+def load_runs(path=None):
+    """Lit l'historique des exécutions, de la plus ancienne à la plus récente (lignes illisibles ignorées)."""
+    path = path or config.RUN_HISTORY_PATH
+    runs = []
+    if not os.path.exists(path):
+        return runs
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                runs.append(json.loads(line))
+            except json.JSONDecodeError:
+                logging.warning(f"Ligne {line_number} de {path} illisible, ignorée.")
+    return runs
+
+
+def _z_score(value, baseline):
+    """Écart de value à la moyenne de baseline, en écarts-types (infini si la référence est constante)."""
+    mean = statistics.mean(baseline)
+    stdev = statistics.stdev(baseline)
+    if stdev == 0:
+        return 0.0 if value == mean else float('inf') if value > mean else float('-inf')
+    return (value - mean) / stdev
+
+
+def compare_runs(window=None, threshold=None, path=None):
+    """
+    Compare la dernière exécution aux `window` précédentes de même mode et mêmes cibles.
+    Une régression est signalée pour un indicateur qui se dégrade d'au moins `threshold`
+    écarts-types (z-score) et d'au moins RUN_COMPARE_MIN_RELATIVE_CHANGE par rapport à la
+    moyenne de référence.
+
+    Returns:
+        tuple: (rapport textuel, True si aucune régression n'est détectée).
+    """
+    window = window or config.RUN_COMPARE_WINDOW
+    threshold = threshold or config.RUN_COMPARE_Z_THRESHOLD
+    path = path or config.RUN_HISTORY_PATH
+
+    # Une exécution sans page scrapée (site indisponible, interruption) ne mesure pas le débit
+    runs = [run for run in load_runs(path) if run.get('pages')]
+    if not runs:
+        return f"Aucune exécution exploitable dans {path}.", True
+
+    latest = runs[-1]
+    baseline_runs = [
+        run for run in runs[:-1]
+        if run.get('mode') == latest.get('mode') and run.get('base_urls') == latest.get('base_urls')
+    ][-window:]
+    header = (f"Exécution du {latest['date']} (mode {latest['mode']}, {latest['pages']} pages, "
+              f"{latest['duree_secondes']:.1f} s) comparée à {len(baseline_runs)} exécutions précédentes.")
+    if len(baseline_runs) < config.RUN_COMPARE_MIN_BASELINE:
+        return (header + f"\nHistorique insuffisant (au moins {config.RUN_COMPARE_MIN_BASELINE} exécutions "
+                "comparables nécessaires) : aucune comparaison."), True
+
+    lines = []
+    regressions = []
+    for metric, better in config.RUN_COMPARE_METRICS.items():
+        value = latest.get(metric)
+        baseline = [run[metric] for run in baseline_runs if run.get(metric) is not None]
+        if value is None or len(baseline) < config.RUN_COMPARE_MIN_BASELINE:
+            continue
+        mean = statistics.mean(baseline)
+        z = _z_score(value, baseline)
+        relative_change = (value - mean) / mean if mean else (0.0 if value == mean else float('inf'))
+        worse = z < 0 if better == 'higher' else z > 0
+        regression = worse and abs(z) >= threshold and abs(relative_change) >= config.RUN_COMPARE_MIN_RELATIVE_CHANGE
+        if regression:
+            regressions.append(metric)
+        lines.append(f"  - {metric}: {value:.4g} (référence {mean:.4g} ± {statistics.stdev(baseline):.2g}, "
+                     f"{relative_change:+.0%}, z = {z:+.1f}){' RÉGRESSION' if regression else ''}")
+
+    if regressions:
+        verdict = f"ÉCHEC : régression significative sur {', '.join(regressions)}."
+    else:
+        verdict = "Aucune régression significative."
+    return header + "\n" + "\n".join(lines) + "\n" + verdict, not regressions
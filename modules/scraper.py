@@ -2,136 +2,382 @@
 
 import requests
 from bs4 import BeautifulSoup
+from collections import Counter
 from datetime import datetime
+from urllib.parse import urlsplit
+import re
 import time
 import logging
 
 from . import config
 from . import review_parser
 from . import database
+from .health_monitor import SelectorHealthMonitor
+from .page_archive import PageArchive
+from .run_history import record_run
 
-# Configure le logging pour le module scraper
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def download_page(page_url, session=None):
+    """
+    Télécharge le HTML brut d'une page.
+
+    Args:
+        page_url (str): L'URL de la page.
+        session (requests.Session, optional): Session réutilisée d'une requête à l'autre (connexions gardées ouvertes).
+
+    Returns:
+        str: Le HTML de la page.
+
+    Raises:
+        requests.exceptions.RequestException: En cas d'erreur réseau ou de code HTTP d'erreur.
+    """
+    logging.info(f"Scraping URL: {page_url}")
+    response = (session or requests).get(page_url, headers={"User-Agent": config.USER_AGENT})
+    response.raise_for_status()  # Lève une exception pour les codes d'état HTTP d'erreur
+    return response.text
+
+
+def fetch_page(page_url, session=None):
+    """
+    Télécharge le HTML brut d'une page.
+
+    Returns:
+        str: Le HTML de la page, une chaîne vide si la page n'existe pas (404 au-delà de la
+             dernière page d'avis), ou None en cas d'erreur de requête.
+    """
+    try:
+        return download_page(page_url, session)
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            logging.info(f"Page {page_url} introuvable (404) : fin de la pagination.")
+            return ""
+        logging.error(f"Erreur de requête pour {page_url}: {e}")
+        return None
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Erreur de requête pour {page_url}: {e}")
+        return None
 
 
-def scrape_page(page_url, current_datetime):
+def scrape_page(page_url, current_datetime, health_monitor=None, archive=None, session=None, report=None):
     """
     Gratte une seule page d'avis et extrait les données pertinentes.
 
     Args:
         page_url (str): L'URL de la page à scraper.
         current_datetime (datetime): L'horodatage actuel pour la date de scraping.
+        health_monitor (SelectorHealthMonitor, optional): Suivi des taux d'extraction par champ.
+        archive (PageArchive, optional): Si fourni, le HTML brut de la page y est ajouté.
+        session (requests.Session, optional): Session HTTP à réutiliser.
+        report (RunReport, optional): Si fourni, reçoit les durées de téléchargement et d'analyse.
 
     Returns:
         list: Une liste de dictionnaires, où chaque dictionnaire représente un avis.
               Retourne une liste vide en cas d'erreur ou si aucun avis n'est trouvé.
     """
-    logging.info(f"Scraping URL: {page_url}")
-    try:
-        response = requests.get(page_url, headers={"User-Agent": config.USER_AGENT})
-        response.raise_for_status()  # Lève une exception pour les codes d'état HTTP d'erreur
-        soup = BeautifulSoup(response.text, 'lxml') # Utiliser lxml pour de meilleures performances si installé
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Erreur de requête pour {page_url}: {e}")
+    started = time.perf_counter()
+    html = fetch_page(page_url, session)
+    if report:
+        report.add_fetch(html, time.perf_counter() - started)
+    if not html:
         return []
 
-    review_container_elements = soup.find_all('div', class_='styles_cardWrapper__g8amG styles_show__Z8n7u')
+    if archive:
+        archive.append(page_url, html, current_datetime)
 
-    if not review_container_elements:
-        logging.info(f"Aucun conteneur d'avis trouvé sur {page_url} avec la classe spécifiée.")
-        return []
+    started = time.perf_counter()
+    reviews = parse_page(html, page_url, current_datetime, health_monitor)
+    if report:
+        report.add_parse(reviews, time.perf_counter() - started)
+    return reviews
 
-    all_reviews_data = []
-    for review_container_elem in review_container_elements:
-        # Chaque conteneur doit contenir une balise <article>
-        review_soup_article = review_container_elem.find('article')
 
-        if not review_soup_article:
-            logging.warning("Balise <article> non trouvée dans un conteneur d'avis. Ignoré.")
-            continue
+def cible_from_url(page_url):
+    """
+    Entreprise (cible) d'une page d'avis : l'identifiant Trustpilot qui suit "/review/" dans l'URL
+    ("https://fr.trustpilot.com/review/nickel.eu?page=2" -> "nickel.eu").
+    À défaut, l'hôte et le chemin de l'URL, ou DEFAULT_CIBLE pour une URL vide.
+    """
+    match = re.search(r"/review/([^/?#]+)", page_url or "")
+    if match:
+        return match.group(1)
+    parts = urlsplit(page_url or "")
+    return (parts.netloc + parts.path).rstrip('/') or config.DEFAULT_CIBLE
+
+
+def iter_page_reviews(html, page_url, current_datetime, health_monitor=None):
+    """
+    Extrait un à un les avis du HTML d'une page (page fraîchement téléchargée ou archivée).
+    L'arbre de chaque avis est libéré (decompose) dès son extraction, et celui de la page
+    une fois le parcours terminé : la mémoire ne dépend pas du nombre de pages parcourues.
+
+    Yields:
+        dict: Un dictionnaire par avis, avec l'entreprise (cible) déduite de page_url.
+    """
+    cible = cible_from_url(page_url)
+    soup = BeautifulSoup(html, 'lxml') # Utiliser lxml pour de meilleures performances si installé
+    try:
+        review_container_elements = soup.find_all('div', class_='styles_cardWrapper__g8amG styles_show__Z8n7u')
+
+        if not review_container_elements:
+            logging.info(f"Aucun conteneur d'avis trouvé sur {page_url} avec la classe spécifiée.")
+            if health_monitor:
+                health_monitor.record_missing_containers(page_url, soup)
+            return
+
+        nb_reviews = 0
+        empty_container_html = None
+        for review_container_elem in review_container_elements:
+            review_data = _extract_review(review_container_elem, current_datetime, health_monitor)
+            if review_data is None and empty_container_html is None:
+                empty_container_html = str(review_container_elem) # Copié avant libération de l'arbre
+            review_container_elem.decompose()
+            if review_data is not None:
+                review_data['cible'] = cible
+                nb_reviews += 1
+                yield review_data
+
+        if nb_reviews == 0:
+            # Des conteneurs sans aucun avis exploitable : ce n'est pas une fin de pagination
+            logging.warning(f"{len(review_container_elements)} conteneurs d'avis sur {page_url} mais aucun avis extrait.")
+            if health_monitor:
+                health_monitor.record_empty_containers(page_url, len(review_container_elements), empty_container_html)
+        if health_monitor:
+            health_monitor.end_page(page_url)
+    finally:
+        soup.decompose()
+
+
+def _extract_review(review_container_elem, current_datetime, health_monitor=None):
+    """Extrait les données d'un conteneur d'avis, ou retourne None s'il ne contient pas de <article>."""
+    # Chaque conteneur doit contenir une balise <article>
+    review_soup_article = review_container_elem.find('article')
+
+    if not review_soup_article:
+        logging.warning("Balise <article> non trouvée dans un conteneur d'avis. Ignoré.")
+        return None
 
-        review_data = {}
-        # Extraction des données en utilisant les fonctions de review_parser
-        review_data['date_publication'] = review_parser.extract_publication_date(review_soup_article)
-        review_data['nom'] = review_parser.extract_reviewer_name(review_soup_article)
-        review_data['nombre_avis'] = review_parser.extract_num_reviews(review_soup_article)
-        review_data['langue_origine'] = review_parser.extract_original_language(review_soup_article)
-        review_data['note_avis'] = review_parser.extract_review_rating(review_soup_article)
-        
-        # Extraction de la date d'expérience et de ses composants
-        date_exp_str, jour_exp, mois_exp, annee_exp = review_parser.extract_experience_date(review_soup_article)
-        review_data['date_experience'] = date_exp_str
-        review_data['jour_experience'] = jour_exp
-        review_data['mois_experience'] = mois_exp
-        review_data['annee_experience'] = annee_exp
-        
-        review_data['contenu_avis'] = review_parser.extract_review_content(review_soup_article)
-        review_data['avis_sur_invitation'] = review_parser.extract_invitation_status(review_soup_article)
-        
-        review_data['contenu_hash'] = review_parser.generate_content_hash(review_soup_article)
-
-        # Sentiment basé sur la note de l'avis
-        review_data['sentiment'] = review_parser.analyze_sentiment(review_data['note_avis'])
-
-        review_data['date_scraping'] = current_datetime.strftime('%Y-%m-%d %H:%M:%S')
-        
-        review_data['reponse'] = review_parser.reponse(review_soup_article)
-        review_data['date_reponse'] = review_parser.extract_response_date(review_soup_article)
-
-        all_reviews_data.append(review_data)
+    review_data = {}
+    # Extraction des données en utilisant les fonctions de review_parser
+    review_data['date_publication'] = review_parser.extract_publication_date(review_soup_article)
+    review_data['nom'] = review_parser.extract_reviewer_name(review_soup_article)
+    review_data['nombre_avis'] = review_parser.extract_num_reviews(review_soup_article)
+    review_data['langue_origine'] = review_parser.extract_original_language(review_soup_article)
+    review_data['note_avis'] = review_parser.extract_review_rating(review_soup_article)
     
-    return all_reviews_data
+    # Extraction de la date d'expérience et de ses composants
+    date_exp_str, jour_exp, mois_exp, annee_exp = review_parser.extract_experience_date(review_soup_article)
+    review_data['date_experience'] = date_exp_str
+    review_data['jour_experience'] = jour_exp
+    review_data['mois_experience'] = mois_exp
+    review_data['annee_experience'] = annee_exp
+    
+    review_data['contenu_avis'] = review_parser.extract_review_content(review_soup_article)
+    review_data['avis_sur_invitation'] = review_parser.extract_invitation_status(review_soup_article)
+    
+    review_data['contenu_hash'] = review_parser.generate_content_hash(review_soup_article)
 
-#def run_scraper(max_pages_to_scrape=3): # scraping sur 3 pages pour les tests
-def run_scraper(): # Pour scraper toutes les pages
-    database.create_reviews_table()
+    # Sentiment basé sur la note de l'avis
+    review_data['sentiment'] = review_parser.analyze_sentiment(review_data['note_avis'])
 
-    page = 1
-    total_new_reviews = 0
-    added_reviews_summary = []
+    review_data['date_scraping'] = current_datetime.strftime('%Y-%m-%d %H:%M:%S')
     
-    #while page <= max_pages_to_scrape: # pour tester le scraping sur 3 pages
-    while True:
-        current_datetime_for_scraping = datetime.now()
+    review_data['reponse'] = review_parser.reponse(review_soup_article)
+    review_data['date_reponse'] = review_parser.extract_response_date(review_soup_article)
+
+    if health_monitor:
+        health_monitor.record_review(review_data, review_soup_article)
+
+    return review_data
+
+
+def parse_page(html, page_url, current_datetime, health_monitor=None):
+    """
+    Extrait les avis du HTML d'une page (page fraîchement téléchargée ou archivée).
+
+    Returns:
+        list: Une liste de dictionnaires, où chaque dictionnaire représente un avis.
+    """
+    # Une page compte une vingtaine d'avis : c'est l'unité d'écriture en base
+    return list(iter_page_reviews(html, page_url, current_datetime, health_monitor))
+
+
+def iter_site_pages(base_url, health_monitor=None, archive=None, report=None):
+    """
+    Parcourt les pages d'avis d'une cible jusqu'à la première page sans avis.
+    Les pages sont téléchargées au fur et à mesure de la consommation du générateur.
 
-        page_url = f"{config.BASE_URL}{page}" # Correction: config.BASE_URL doit déjà contenir "?page="
-        reviews_on_page = scrape_page(page_url, current_datetime_for_scraping)
+    Yields:
+        tuple: (numéro de page, liste des avis de la page).
+    """
+    page = 1
+    while True:
+        page_url = f"{base_url}{page}" # Correction: base_url doit déjà contenir "?page="
+        reviews_on_page = scrape_page(page_url, datetime.now(), health_monitor, archive, report=report)
 
         if not reviews_on_page:
             logging.info(f"Plus d'avis trouvés sur la page {page}, arrêt du scraping.")
-            break
-
-        for review in reviews_on_page:
-            # Vérifier que le hash est bien généré avant l'insertion
-            if review.get('contenu_hash') is None:
-                logging.warning(f"Impossible d'insérer l'avis : 'contenu_hash' manquant pour {review.get('nom', 'N/A')}.")
-                continue # Passe à l'avis suivant si le hash est manquant
-
-            if database.insert_review_data(review):
-                total_new_reviews += 1
-                summary = (
-                    f"  - Nom: {review.get('nom', 'N/A')}, "
-                    f"Date Pub: {review.get('date_publication', 'N/A')}, "
-                    f"Contenu (extrait): {review.get('contenu_avis', 'N/A')[:50]}..."
-                )
-                added_reviews_summary.append(summary)
-        
+            return
+
+        yield page, reviews_on_page
         page += 1
         time.sleep(config.SLEEP_TIME)
 
-    if not reviews_on_page and page > 1: 
-        final_message = f"Scraping terminé car plus d'avis trouvés après la page {page - 1}.\n"
+
+class RunReport:
+    """
+    État d'une exécution conservé pour le rapport final : des compteurs et un échantillon
+    de taille fixe (REPORT_SAMPLE_SIZE) des avis ajoutés, quelle que soit la durée de l'exécution.
+    Les volumes et durées par étape (téléchargement, analyse, stockage) alimentent l'historique
+    des exécutions (modules/run_history.py).
+    """
+
+    def __init__(self, sample_size=None):
+        self.sample_size = sample_size if sample_size is not None else config.REPORT_SAMPLE_SIZE
+        self.nb_pages = 0
+        self.total_new_reviews = 0
+        self.total_updated_reviews = 0
+        self.sample = []
+        self.pages_fetched = 0
+        self.bytes_fetched = 0
+        self.fetch_errors = 0
+        self.missing_pages = 0 # 404 au-delà de la dernière page : fin normale, pas une erreur
+        self.reviews_parsed = 0
+        self.stage_seconds = Counter()
+
+    def add_fetch(self, html, seconds):
+        """Comptabilise un téléchargement de page (html None en cas d'erreur de requête, vide si la page n'existe pas)."""
+        self.stage_seconds['telechargement'] += seconds
+        if html is None:
+            self.fetch_errors += 1
+        elif html == "":
+            self.missing_pages += 1
+        else:
+            self.pages_fetched += 1
+            self.bytes_fetched += len(html.encode('utf-8'))
+
+    def add_parse(self, reviews, seconds):
+        """Comptabilise l'analyse d'une page."""
+        self.stage_seconds['analyse'] += seconds
+        self.reviews_parsed += len(reviews)
+
+    def add_page(self, inserted_reviews, nb_updated):
+        """Comptabilise une page écrite en base."""
+        self.nb_pages += 1
+        self.total_new_reviews += len(inserted_reviews)
+        self.total_updated_reviews += nb_updated
+        for review in inserted_reviews[:self.sample_size - len(self.sample)]:
+            self.sample.append(
+                f"  - Nom: {review.get('nom', 'N/A')}, "
+                f"Date Pub: {review.get('date_publication', 'N/A')}, "
+                f"Contenu (extrait): {review.get('contenu_avis', 'N/A')[:50]}..."
+            )
+
+
+def _store_reviews(reviews, report, detect_changes=True):
+    """
+    Écrit les avis d'une page en base et les comptabilise dans le rapport.
+
+    Args:
+        detect_changes (bool): Mettre à jour les avis déjà connus dont la réponse ou la note a changé.
+            À désactiver pour des pages qui peuvent être plus anciennes que la base (archive).
+
+    Returns:
+        tuple: (nombre d'avis ajoutés, nombre d'avis existants mis à jour).
+    """
+    # Insertion de tous les avis de la page en un seul lot (une seule transaction)
+    started = time.perf_counter()
+    if detect_changes:
+        inserted_reviews, nb_updated = database.upsert_reviews_batch(reviews)
     else:
-        final_message = "Scraping terminé.\n"
+        inserted_reviews, nb_updated = database.insert_reviews_batch(reviews), 0
+    report.stage_seconds['stockage'] += time.perf_counter() - started
+    report.add_page(inserted_reviews, nb_updated)
+    return len(inserted_reviews), nb_updated
+
 
-    final_message += f"{total_new_reviews} nouveaux avis ajoutés à la base de données.\n"
+def _format_report(final_message, report, health_monitor):
+    """Complète le message de fin avec les compteurs, l'échantillon des avis ajoutés et la santé des sélecteurs."""
+    final_message += f"{report.total_new_reviews} nouveaux avis ajoutés à la base de données.\n"
+    final_message += f"{report.total_updated_reviews} avis existants mis à jour (réponse ou note modifiée).\n"
 
-    if added_reviews_summary:
+    if report.sample:
         final_message += "\nDétail des nouveaux avis ajoutés :\n"
-        final_message += "\n".join(added_reviews_summary[:10]) 
-        if len(added_reviews_summary) > 10:
-            final_message += "\n  (Affichage limité aux 10 premiers avis ajoutés...)"
+        final_message += "\n".join(report.sample) 
+        if report.total_new_reviews > len(report.sample):
+            final_message += f"\n  (Affichage limité aux {len(report.sample)} premiers avis ajoutés...)"
     else:
         final_message += "Aucun nouvel avis n'a été ajouté cette fois-ci."
 
-    return final_message
\ No newline at end of file
+    final_message += "\n\n" + health_monitor.summary()
+    if health_monitor.alerts:
+        final_message += "\nAlertes :\n" + "\n".join(f"  - {alert}" for alert in health_monitor.alerts)
+    return final_message
+
+#def run_scraper(max_pages_to_scrape=3): # scraping sur 3 pages pour les tests
+def run_scraper(archive_pages=None, base_url=None): # Pour scraper toutes les pages
+    """
+    Scrape toutes les pages d'avis et les enregistre en base.
+
+    Args:
+        base_url (str, optional): URL de base se terminant par "?page=" (par défaut config.BASE_URL).
+        archive_pages (bool, optional): Archiver le HTML brut de chaque page (par défaut config.ARCHIVE_PAGES).
+
+    Returns:
+        str: Le rapport de scraping.
+    """
+    base_url = base_url or config.BASE_URL
+    database.ensure_schema()
+    health_monitor = SelectorHealthMonitor()
+    if archive_pages is None:
+        archive_pages = config.ARCHIVE_PAGES
+    archive = PageArchive() if archive_pages else None
+
+    report = RunReport()
+    started = time.perf_counter()
+    
+    try:
+        for _, reviews_on_page in iter_site_pages(base_url, health_monitor, archive, report):
+            _store_reviews(reviews_on_page, report)
+    finally:
+        if archive:
+            archive.close()
+
+    record_run('sync', [report], time.perf_counter() - started, [base_url])
+
+    if health_monitor.selector_failure:
+        # Une page contenait des avis que le parser n'a pas reconnus : ce n'est pas une fin normale
+        final_message = f"ÉCHEC : scraping interrompu à la page {report.nb_pages + 1}, les sélecteurs ne reconnaissent plus les avis.\n"
+    elif report.nb_pages > 0: 
+        final_message = f"Scraping terminé car plus d'avis trouvés après la page {report.nb_pages}.\n"
+    else:
+        final_message = "Scraping terminé.\n"
+
+    return _format_report(final_message, report, health_monitor)
+
+
+def reprocess_archive(archive_dir=None):
+    """
+    Rejoue les pages archivées dans le parser puis dans la base, sans aucun accès réseau
+    (par exemple après l'ajout d'un champ ou une modification du parser).
+    La date de scraping de chaque avis est celle de la récupération d'origine de la page.
+    Seuls les avis absents de la base sont insérés : une page archivée peut être plus ancienne
+    que la base, et ses réponses ou notes ne doivent pas écraser des données plus récentes.
+
+    Returns:
+        str: Le rapport de retraitement.
+    """
+    database.ensure_schema()
+    health_monitor = SelectorHealthMonitor()
+
+    nb_pages = 0
+    report = RunReport()
+
+    for page_url, fetched_at, html in PageArchive(archive_dir).iter_pages():
+        nb_pages += 1
+        reviews_on_page = parse_page(html, page_url, fetched_at, health_monitor)
+        if not reviews_on_page:
+            continue
+        _store_reviews(reviews_on_page, report, detect_changes=False)
+
+    final_message = f"Retraitement terminé : {nb_pages} pages archivées relues.\n"
+    return _format_report(final_message, report, health_monitor)
@@ -0,0 +1,73 @@
+# modules/search.py
+
+import logging
+
+from . import config
+from . import database
+
+
+# Colonnes retournées pour chaque avis trouvé
+SEARCH_RESULT_COLUMNS = ['id', 'cible', 'nom', 'note_avis', 'date_publication', 'rang', 'extrait']
+
+
+def search_reviews(query, note_min=None, note_max=None, date_debut=None, date_fin=None, limit=None, cible=None):
+    """
+    Recherche plein texte dans le contenu des avis (configuration 'french' de PostgreSQL).
+    La requête accepte la syntaxe web : mots, "expressions exactes", OR, -exclusion.
+
+    Args:
+        query (str): Le texte recherché.
+        note_min (int, optional): Note minimale incluse.
+        note_max (int, optional): Note maximale incluse.
+        date_debut (date, optional): Date de publication minimale incluse.
+        date_fin (date, optional): Date de publication maximale incluse.
+        limit (int, optional): Nombre maximal de résultats.
+        cible (str, optional): Entreprise ("nickel.eu") ; par défaut, toutes.
+
+    Returns:
+        list: Dictionnaires (id, cible, nom, note_avis, date_publication, rang, extrait), du plus pertinent au moins pertinent.
+    """
+    params = {
+        'query': query,
+        'config': config.FULLTEXT_CONFIG,
+        'note_min': note_min,
+        'note_max': note_max,
+        'date_debut': date_debut,
+        'date_fin': date_fin,
+        'limit': limit or config.FULLTEXT_DEFAULT_LIMIT,
+        'cible': cible,
+    }
+    # Le classement et le filtrage utilisent l'index GIN ; l'extrait (ts_headline, coûteux)
+    # n'est calculé que sur les lignes retenues après le LIMIT.
+    search_query = """
+        WITH q AS (SELECT websearch_to_tsquery(%(config)s::regconfig, %(query)s) AS tsq),
+        matches AS (
+            SELECT r.id, r.cible, r.nom, r.note_avis, r.date_publication, r.contenu_avis,
+                   ts_rank(r.contenu_tsv, q.tsq) AS rang, q.tsq
+            FROM reviews_nickel r, q
+            WHERE r.contenu_tsv @@ q.tsq
+              AND (%(cible)s::text IS NULL OR r.cible = %(cible)s)
+              AND (%(note_min)s::integer IS NULL OR r.note_avis >= %(note_min)s::integer)
+              AND (%(note_max)s::integer IS NULL OR r.note_avis <= %(note_max)s::integer)
+              AND (%(date_debut)s::date IS NULL OR r.date_publication >= %(date_debut)s::date)
+              AND (%(date_fin)s::date IS NULL OR r.date_publication < %(date_fin)s::date + 1)
+            ORDER BY rang DESC, r.date_publication DESC
+            LIMIT %(limit)s
+        )
+        SELECT id, cible, nom, note_avis, date_publication, rang,
+               ts_headline(%(config)s::regconfig, contenu_avis, tsq, 'MaxFragments=2, MaxWords=20, MinWords=5')
+        FROM matches
+        ORDER BY rang DESC, date_publication DESC;
+    """
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            c.execute(search_query, params)
+            return [dict(zip(SEARCH_RESULT_COLUMNS, row)) for row in c.fetchall()]
+    except Exception as e:
+        logging.error(f"Erreur lors de la recherche plein texte '{query}' : {e}")
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
@@ -0,0 +1,305 @@
+# modules/work_queue.py
+
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+
+import requests
+from psycopg2.extras import execute_values
+
+from . import config
+from . import database
+from .health_monitor import SelectorHealthMonitor
+from .scraper import RunReport, download_page, parse_page, _store_reviews
+
+
+def default_worker_id():
+    """Identifiant unique d'un worker : machine et processus."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _split_uncovered_pages(nb_pages, covered_ranges, pages_per_task):
+    """
+    Découpe les pages 1 à nb_pages non couvertes par covered_ranges (plages (page_debut, page_fin)
+    déjà en file) en plages contiguës d'au plus pages_per_task pages.
+
+    Returns:
+        list: Plages (page_debut, page_fin).
+    """
+    covered = set()
+    for page_debut, page_fin in covered_ranges:
+        covered.update(range(page_debut, page_fin + 1))
+    ranges = []
+    for page in range(1, nb_pages + 1):
+        if page in covered:
+            continue
+        # Une page prolonge la plage précédente si elle lui est contiguë et que la plage n'est pas pleine
+        if ranges and ranges[-1][1] == page - 1 and page - ranges[-1][0] < pages_per_task:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return [tuple(page_range) for page_range in ranges]
+
+
+def enqueue_tasks(nb_pages, base_urls=None, pages_per_task=None):
+    """
+    Découpe les pages 1 à nb_pages de chaque cible en tâches de pages_per_task pages.
+    Idempotent : les pages déjà couvertes par une tâche de la même cible (quel que soit son statut
+    et son découpage) ne sont pas ajoutées une seconde fois, seules les pages restantes le sont.
+
+    Returns:
+        int: Le nombre de tâches ajoutées.
+    """
+    base_urls = base_urls or config.SCRAPE_TARGETS
+    pages_per_task = pages_per_task or config.WORK_QUEUE_PAGES_PER_TASK
+    database.create_reviews_table()
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            tasks = []
+            for base_url in sorted(set(base_urls)):
+                # Deux enqueue simultanés sur une même cible sont sérialisés (sans bloquer les workers)
+                c.execute("SELECT pg_advisory_xact_lock(hashtext('crawl_tasks:' || %s));", (base_url,))
+                c.execute("SELECT page_debut, page_fin FROM crawl_tasks WHERE base_url = %s;", (base_url,))
+                tasks.extend(
+                    (base_url, page_debut, page_fin)
+                    for page_debut, page_fin in _split_uncovered_pages(nb_pages, c.fetchall(), pages_per_task)
+                )
+            inserted = execute_values(c, """
+                INSERT INTO crawl_tasks (base_url, page_debut, page_fin)
+                VALUES %s
+                ON CONFLICT (base_url, page_debut, page_fin) DO NOTHING
+                RETURNING id;
+            """, tasks, fetch=True) if tasks else []
+        conn.commit()
+        logging.info(f"{len(inserted)} tâches ajoutées à la file (pages déjà couvertes par une tâche ignorées).")
+        return len(inserted)
+    except Exception as e:
+        logging.error(f"Erreur lors de l'ajout des tâches à la file : {e}")
+        if conn:
+            database._rollback(conn)
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
+
+
+def lease_task(worker_id):
+    """
+    Réserve la plus ancienne tâche disponible : en attente, ou en cours avec un bail expiré.
+    SKIP LOCKED fait ignorer les tâches qu'un autre worker est en train de réserver : deux workers
+    n'obtiennent jamais la même tâche. Une tâche dont le bail a expiré après sa dernière tentative
+    autorisée (worker arrêté) passe d'abord en échec : elle ne resterait sinon jamais close.
+
+    Returns:
+        tuple: (id, base_url, première page à traiter, page_fin, tentatives), ou None si la file est vide.
+               Une tâche reprise commence après la dernière page déjà traitée.
+    """
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            c.execute("""
+                UPDATE crawl_tasks
+                SET statut = 'echec', bail_expire_le = NULL,
+                    derniere_erreur = COALESCE(derniere_erreur || ' ; ', '') || 'bail expiré à la dernière tentative (worker ' || COALESCE(worker, '?') || ')'
+                WHERE statut = 'en_cours' AND bail_expire_le < NOW() AND tentatives >= %s
+                RETURNING id;
+            """, (config.WORK_QUEUE_MAX_ATTEMPTS,))
+            for (task_id,) in c.fetchall():
+                logging.warning(f"Tâche {task_id} en échec : bail expiré après {config.WORK_QUEUE_MAX_ATTEMPTS} tentatives.")
+            c.execute("""
+                UPDATE crawl_tasks
+                SET statut = 'en_cours', worker = %s, tentatives = tentatives + 1,
+                    bail_expire_le = NOW() + %s * INTERVAL '1 second', date_debut = NOW()
+                WHERE id = (
+                    SELECT id FROM crawl_tasks
+                    WHERE (statut = 'en_attente' OR (statut = 'en_cours' AND bail_expire_le < NOW()))
+                      AND tentatives < %s
+                    ORDER BY id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, base_url, COALESCE(derniere_page_traitee + 1, page_debut), page_fin, tentatives;
+            """, (worker_id, config.WORK_QUEUE_LEASE_SECONDS, config.WORK_QUEUE_MAX_ATTEMPTS))
+            task = c.fetchone()
+        conn.commit()
+        return task
+    except Exception as e:
+        logging.error(f"Erreur lors de la réservation d'une tâche : {e}")
+        if conn:
+            database._rollback(conn)
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
+
+
+def _update_owned_task(task_id, worker_id, assignments, params=()):
+    """
+    Met à jour une tâche seulement si elle est toujours louée par ce worker : un worker dont le bail
+    a expiré (tâche reprise par un autre) ne peut plus ni la prolonger ni la clore.
+
+    Returns:
+        bool: True si la tâche a été mise à jour.
+    """
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            c.execute(f"""
+                UPDATE crawl_tasks SET {assignments}
+                WHERE id = %s AND worker = %s AND statut = 'en_cours';
+            """, (*params, task_id, worker_id))
+            updated = c.rowcount == 1
+        conn.commit()
+        return updated
+    except Exception as e:
+        logging.error(f"Erreur lors de la mise à jour de la tâche {task_id} : {e}")
+        if conn:
+            database._rollback(conn)
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)
+
+
+# Les compteurs s'additionnent d'une tentative à l'autre (une tâche reprise ne refait pas les pages déjà traitées)
+_COUNTERS_ASSIGNMENTS = """
+    nb_pages_traitees = COALESCE(nb_pages_traitees, 0) + %s,
+    nb_avis_nouveaux = COALESCE(nb_avis_nouveaux, 0) + %s,
+    nb_avis_mis_a_jour = COALESCE(nb_avis_mis_a_jour, 0) + %s
+"""
+
+
+def _counters(report):
+    return report.nb_pages, report.total_new_reviews, report.total_updated_reviews
+
+
+def extend_lease(task_id, worker_id, last_page_done):
+    """
+    Prolonge le bail d'une tâche en cours et enregistre la dernière page entièrement traitée.
+
+    Returns:
+        bool: False si le bail a été perdu (expiré et repris par un autre worker).
+    """
+    return _update_owned_task(task_id, worker_id, """
+        derniere_page_traitee = %s, bail_expire_le = NOW() + %s * INTERVAL '1 second'
+    """, (last_page_done, config.WORK_QUEUE_LEASE_SECONDS))
+
+
+def complete_task(task_id, worker_id, report):
+    """
+    Marque une tâche comme terminée. Idempotent : sans effet si la tâche est déjà close
+    ou a été reprise par un autre worker.
+    """
+    done = _update_owned_task(task_id, worker_id, """
+        statut = 'termine', date_fin = NOW(), bail_expire_le = NULL, derniere_erreur = NULL,
+    """ + _COUNTERS_ASSIGNMENTS, _counters(report))
+    if not done:
+        logging.warning(f"Tâche {task_id} déjà close ou reprise par un autre worker : clôture ignorée.")
+    return done
+
+
+def fail_task(task_id, worker_id, error, report):
+    """Remet la tâche en attente pour une nouvelle tentative, ou la passe en échec après WORK_QUEUE_MAX_ATTEMPTS."""
+    return _update_owned_task(task_id, worker_id, """
+        statut = CASE WHEN tentatives < %s THEN 'en_attente' ELSE 'echec' END,
+        bail_expire_le = NULL, derniere_erreur = %s,
+    """ + _COUNTERS_ASSIGNMENTS, (config.WORK_QUEUE_MAX_ATTEMPTS, str(error), *_counters(report)))
+
+
+def process_task(task, worker_id, report):
+    """
+    Scrape la plage de pages d'une tâche avec la logique de scrape_page et enregistre les avis.
+    Les écritures sont idempotentes (ON CONFLICT) : une tâche reprise après l'expiration
+    d'un bail n'insère aucun doublon.
+    """
+    task_id, base_url, page_debut, page_fin, _ = task
+    health_monitor = SelectorHealthMonitor()
+    for page in range(page_debut, page_fin + 1):
+        page_url = f"{base_url}{page}"
+        try:
+            html = download_page(page_url)
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise # Erreur passagère (429, 5xx) : la tâche est remise en file, la fin de sa plage n'est pas perdue
+            html = "" # Page au-delà de la dernière page d'avis
+        reviews_on_page = parse_page(html, page_url, datetime.now(), health_monitor) if html else []
+        if health_monitor.selector_failure:
+            raise RuntimeError(f"Sélecteurs obsolètes sur la page {page} de {base_url}.")
+        if not reviews_on_page:
+            logging.info(f"Plus d'avis trouvés sur la page {page} de {base_url} : fin de la tâche {task_id}.")
+            break
+        # Bail prolongé (et sa détention vérifiée) avant l'écriture : une page lente à télécharger
+        # ou à écrire n'est pas confiée en parallèle à un second worker. En cas d'échec, une reprise
+        # refait au plus cette page, sans doublon (écritures idempotentes).
+        if not extend_lease(task_id, worker_id, page - 1):
+            raise RuntimeError(f"Bail de la tâche {task_id} perdu (expiré et repris par un autre worker).")
+        _store_reviews(reviews_on_page, report)
+        time.sleep(config.SLEEP_TIME)
+
+
+def run_worker(worker_id=None, wait=False):
+    """
+    Traite les tâches de la file jusqu'à ce qu'elle soit vide (ou indéfiniment avec wait=True).
+
+    Returns:
+        str: Le rapport du worker.
+    """
+    worker_id = worker_id or default_worker_id()
+    # Pas de migration ici : ses verrous bloqueraient les écritures des autres workers à chaque démarrage
+    missing = database.missing_schema_relations()
+    if missing:
+        raise RuntimeError(f"Schéma de la base incomplet ({', '.join(missing)} absent(s)) : "
+                           "lancez python main.py migrate (ou enqueue) avant les workers.")
+    nb_done = 0
+    nb_failed = 0
+    total_new_reviews = 0
+    total_updated_reviews = 0
+
+    while True:
+        task = lease_task(worker_id)
+        if task is None:
+            if not wait:
+                break
+            time.sleep(config.WORK_QUEUE_POLL_INTERVAL)
+            continue
+
+        task_id, base_url, page_debut, page_fin, attempt = task
+        logging.info(f"Worker {worker_id} : tâche {task_id} ({base_url}, pages {page_debut} à {page_fin}, tentative {attempt}).")
+        report = RunReport()
+        try:
+            process_task(task, worker_id, report)
+            complete_task(task_id, worker_id, report)
+            nb_done += 1
+        except Exception as e:
+            logging.error(f"Échec de la tâche {task_id} : {e}")
+            fail_task(task_id, worker_id, e, report)
+            nb_failed += 1
+        total_new_reviews += report.total_new_reviews
+        total_updated_reviews += report.total_updated_reviews
+
+    return (f"Worker {worker_id} : {nb_done} tâches terminées, {nb_failed} en échec.\n"
+            f"{total_new_reviews} nouveaux avis ajoutés, {total_updated_reviews} avis existants mis à jour.\n"
+            + queue_status())
+
+
+def queue_status():
+    """Résumé de la file : nombre de tâches par statut."""
+    conn = None
+    try:
+        conn = database._get_db_connection()
+        with conn.cursor() as c:
+            c.execute("SELECT statut, COUNT(*) FROM crawl_tasks GROUP BY statut ORDER BY statut;")
+            counts = c.fetchall()
+        return "File de tâches : " + (", ".join(f"{statut} {count}" for statut, count in counts) or "vide")
+    except Exception as e:
+        logging.error(f"Erreur lors de la lecture de l'état de la file : {e}")
+        raise
+    finally:
+        if conn:
+            database._release_db_connection(conn)